@@ -1,43 +1,131 @@
-from flask import Flask, request
+from flask import Flask, Response, current_app, g, make_response, request, stream_with_context
 from flask_cors import CORS
 from flask_restx import Api, Resource, fields
 from flask_restx.swagger import build_request_body_parameters_schema
-from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import and_, bindparam, case, func, or_, tuple_
+from sqlalchemy.orm import configure_mappers
 from dotenv import load_dotenv
 import os
 import hashlib, uuid
-import traceback
+import logging
 import secrets
-from datetime import datetime, timedelta
-import json
-import requests
-from utils import default
-import os
-import ast
-
-app = Flask(__name__)
+from threading import Lock, Thread
+from datetime import date, datetime, timedelta
+from utils import decode_cursor, dumps, encode_cursor
+from cache import TTLCache, FileGeneration
+from events import create_event_hub, format_sse
+from notifications import MailjetTransport, NotificationQueue, deadline_updated_payload
+from instrumentation import init_request_instrumentation
+from metrics import init_metrics
+from db_pool import describe_pool, dispose_after_fork, pool_options
+from logs import init_logging
+from db_routing import REPLICA_BIND, RoutingSQLAlchemy, init_read_routing, on_primary, reading_from_replica, replica_configured
+from board_import import BoardImportError, read_records
+
+# Routes and models are registered on these at import time; create_app() at
+# the bottom binds them to an application.
 api = Api(
-    app,
     version="1.0",
     title="Surer(FE)",
     description="Aloysius Tan",
 )
+db = RoutingSQLAlchemy()
+logger = logging.getLogger("surer.app")
+
+# Handlers return plain dicts and lists; they are encoded exactly once here.
+@api.representation("application/json")
+def output_json(data, code, headers=None):
+    response = make_response(dumps(data) + b"\n", code)
+    response.headers.extend(headers or {})
+    return response
 
-CORS(app, supports_credentials=True)
 load_dotenv()
 
 # ==================== CONNECTING TO DATABASE ====================#
 db_username = os.getenv("DB_USERNAME")
 db_password = os.getenv("DB_PASSWORD")
 db_endpoint = os.getenv("DB_ENDPOINT")
+db_replica_endpoint = os.getenv("DB_REPLICA_ENDPOINT")
 BASE_URL = os.getenv("BASE_URL")
-app.config["CORS_HEADERS"] = "Content-Type"
-app.config["SQLALCHEMY_DATABASE_URI"] = f"mysql+mysqlconnector://{db_username}:{db_password}@{db_endpoint}"
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["CORS_ALLOW_CREDENTIALS"] = True
-app.config["SESSION_COOKIE_HTTPONLY"] = True
-app.config["REMEMBER_COOKIE_HTTPONLY"] = True
-db = SQLAlchemy(app)
+TASK_ORDERING = os.getenv("TASK_ORDERING", "dense")
+TASK_POSITION_GAP = int(os.getenv("TASK_POSITION_GAP", 1024))
+TASK_REBALANCE_THRESHOLD = int(os.getenv("TASK_REBALANCE_THRESHOLD", 16))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 500))
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", 1000))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+
+def default_config():
+    config = {
+        "CORS_HEADERS": "Content-Type",
+        "SQLALCHEMY_DATABASE_URI": f"mysql+mysqlconnector://{db_username}:{db_password}@{db_endpoint}",
+        "SQLALCHEMY_TRACK_MODIFICATIONS": False,
+        # Applied to the primary and the replica, see /db_pool for how the pool copes
+        "DB_POOL_OPTIONS": pool_options(
+            size=int(os.getenv("DB_POOL_SIZE", 10)),
+            max_overflow=int(os.getenv("DB_POOL_MAX_OVERFLOW", 10)),
+            recycle=int(os.getenv("DB_POOL_RECYCLE", 1800)),
+            timeout=float(os.getenv("DB_POOL_TIMEOUT", 30)),
+            pre_ping=os.getenv("DB_POOL_PRE_PING", "true").lower() not in ("0", "false", "no"),
+        ),
+        "CORS_ALLOW_CREDENTIALS": True,
+        "SESSION_COOKIE_HTTPONLY": True,
+        "REMEMBER_COOKIE_HTTPONLY": True,
+    }
+    if db_replica_endpoint:
+        config["SQLALCHEMY_BINDS"] = {REPLICA_BIND: f"mysql+mysqlconnector://{db_username}:{db_password}@{db_replica_endpoint}"}
+    return config
+
+def database_engines():
+    engines = {"primary": db.engine}
+    if replica_configured(current_app):
+        engines["replica"] = db.get_engine(bind=REPLICA_BIND)
+    return engines
+
+def dispose_engines_after_fork(app):
+    # Called by gunicorn.conf.py in each worker when the app is preloaded
+    with app.app_context():
+        for engine in database_engines().values():
+            dispose_after_fork(engine)
+
+# Session lookups are cached per worker. Entries live for SESSION_CACHE_TTL
+# seconds, and logouts bump SESSION_CACHE_GENERATION_FILE (if set) so that
+# other workers on the same host drop their cached sessions within
+# SESSION_CACHE_GENERATION_INTERVAL seconds.
+session_cache = TTLCache(
+    maxsize=int(os.getenv("SESSION_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("SESSION_CACHE_TTL", 30)),
+)
+session_generation = FileGeneration(
+    os.getenv("SESSION_CACHE_GENERATION_FILE"),
+    interval=float(os.getenv("SESSION_CACHE_GENERATION_INTERVAL", 1)),
+)
+
+# Board change events for /projects/<id>/events. Set EVENTS_REDIS_URL to fan
+# events out to every worker through Redis pub/sub instead of in-process only.
+event_hub = create_event_hub(os.getenv("EVENTS_REDIS_URL"), queue_size=int(os.getenv("EVENTS_QUEUE_SIZE", 100)))
+EVENTS_HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", 15))
+
+# Deadline change emails are sent from background workers. Without
+# MAILJET_API_KEY nothing is queued.
+NOTIFICATION_SENDER = os.getenv("NOTIFICATION_SENDER", "taskucci@gmail.com")
+NOTIFICATION_SENDER_NAME = os.getenv("NOTIFICATION_SENDER_NAME", "Taskucci")
+notification_queue = NotificationQueue(
+    MailjetTransport(
+        os.getenv("MAILJET_API_URL", "https://api.mailjet.com/v3.1/send"),
+        os.getenv("MAILJET_API_KEY"),
+        os.getenv("MAILJET_API_SECRET"),
+    ) if os.getenv("MAILJET_API_KEY") else None,
+    workers=int(os.getenv("NOTIFICATION_WORKERS", 2)),
+    maxsize=int(os.getenv("NOTIFICATION_QUEUE_SIZE", 1000)),
+    retries=int(os.getenv("NOTIFICATION_RETRIES", 3)),
+    backoff=float(os.getenv("NOTIFICATION_BACKOFF", 1)),
+)
+
+# Dashboard results per user, see Dashboard.get for how entries are invalidated
+dashboard_cache = TTLCache(
+    maxsize=int(os.getenv("DASHBOARD_CACHE_SIZE", 1000)),
+    ttl=float(os.getenv("DASHBOARD_CACHE_TTL", 300)),
+)
 
 ################## User Class Creation ##################
 class User(db.Model):
@@ -69,6 +157,7 @@ class Project(db.Model):
     details = db.Column(db.String(1000), nullable=False)
     created_at = db.Column(db.DateTime, nullable=True)
     last_modified = db.Column(db.DateTime, nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
 
     def __init__(self, creator, description, created_at, last_modified):
         self.creator = creator
@@ -83,6 +172,9 @@ class Project(db.Model):
 ################## Team Class Creation ##################
 class Team(db.Model):
     __tablename__ = "team"
+    __table_args__ = (
+        db.Index("idx_team_project_user", "project_id", "user_email"),
+    )
 
     user_email = db.Column(db.String(256), db.ForeignKey('user.email'), primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.project_id'), primary_key=True)
@@ -97,6 +189,9 @@ class Team(db.Model):
 ################## Task Class Creation ##################
 class Task(db.Model):
     __tablename__ = "task"
+    __table_args__ = (
+        db.Index("idx_task_project_status_position", "project_id", "completion_status", "position"),
+    )
 
     task_id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.project_id'), nullable=False)
@@ -125,6 +220,10 @@ class Task(db.Model):
 ################## Assignee Class Creation ##################
 class Assignee(db.Model):
     __tablename__ = "assignee"
+    __table_args__ = (
+        db.Index("idx_assignee_user_task", "user_email", "task_id"),
+        db.Index("idx_assignee_project_task", "project_id", "task_id", "user_email"),
+    )
 
     task_id = db.Column(db.Integer, db.ForeignKey('task.task_id'), primary_key=True)
     project_id = db.Column(db.Integer, db.ForeignKey('project.project_id'), primary_key=True)
@@ -146,6 +245,9 @@ class Assignee(db.Model):
 ################## Sessions Class Creation ##################
 class Sessions(db.Model):
     __tablename__ = "sessions"
+    __table_args__ = (
+        db.Index("idx_sessions_session_id", "session_id"),
+    )
 
     user_email = db.Column(db.String(256), db.ForeignKey('user.email'), primary_key=True)
     session_id = db.Column(db.String(256), primary_key=True)
@@ -158,6 +260,145 @@ class Sessions(db.Model):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
 # ==================== CONNECTED TO DATABASE ====================#
 
+# ==================== SESSION CACHE ====================#
+def get_session_user(session_id):
+    if session_generation.changed():
+        session_cache.clear()
+    user_email = session_cache.get(session_id)
+    if user_email is None:
+        user_session = Sessions.query.filter_by(session_id=session_id).first()
+        if user_session is None and reading_from_replica():
+            # A session created moments ago may not have reached the replica yet
+            with on_primary():
+                user_session = Sessions.query.filter_by(session_id=session_id).first()
+        if user_session is None:
+            return None
+        user_email = user_session.user_email
+        session_cache.set(session_id, user_email)
+    return user_email
+
+def invalidate_session(session_id):
+    session_cache.delete(session_id)
+    session_generation.bump()
+
+# ==================== PROJECT VERSIONS ====================#
+# Every write to a project's board, team or details bumps project.version in
+# the same transaction. Reads use it as an ETag and answer If-None-Match with
+# 304 before loading the payload.
+def bump_project_versions(project_ids):
+    project_ids = {int(project_id) for project_id in project_ids}
+    if project_ids:
+        Project.query.filter(Project.project_id.in_(project_ids)) \
+            .update({Project.version: Project.version + 1}, synchronize_session=False)
+
+def project_etag(project_id):
+    version = db.session.query(Project.version).filter(Project.project_id == project_id).scalar()
+    return None if version is None else f"project-{project_id}-v{version}"
+
+def user_projects_etag(email):
+    versions = db.session.query(Project.project_id, Project.version) \
+        .join(Team, Team.project_id == Project.project_id) \
+        .filter(Team.user_email == email) \
+        .order_by(Project.project_id.asc()).all()
+    digest = hashlib.sha1(repr(versions).encode("utf-8")).hexdigest()
+    return f"teams-{digest}"
+
+def not_modified(etag):
+    return etag is not None and request.if_none_match.contains(etag)
+
+def not_modified_response(etag):
+    response = make_response("", 304)
+    response.set_etag(etag)
+    return response
+
+# ==================== PROJECT EVENTS ====================#
+# Published after the write has been committed, so listeners that reload the
+# board always see the change.
+def project_channel(project_id):
+    return f"project:{int(project_id)}"
+
+def publish_project_event(project_id, event_type, **fields):
+    try:
+        event_hub.publish(project_channel(project_id), {"type": event_type, "project_id": int(project_id), **fields})
+    except Exception:
+        logger.exception("Could not publish project event", extra={"project_id": project_id, "event": event_type})
+
+# ==================== BATCH LOADERS ====================#
+# Per-request loader for User rows. Emails are collected first and resolved
+# with a single IN query; users already seen in this request are not fetched
+# again.
+class UserLoader:
+    def __init__(self):
+        self.users = {}
+
+    def load_many(self, emails):
+        missing = {email for email in emails if email not in self.users}
+        if missing:
+            for user in User.query.filter(User.email.in_(missing)).all():
+                self.users[user.email] = user
+        return [self.users[email] for email in emails if email in self.users]
+
+def get_user_loader():
+    if "user_loader" not in g:
+        g.user_loader = UserLoader()
+    return g.user_loader
+
+def member_info(user):
+    return {
+        "user_email": user.email,
+        "fname": user.first_name,
+        "lname": user.last_name,
+    }
+
+# Returns {project_id: [member, ...]} for all given projects using one query
+# for the team rows and one for the users behind them.
+def load_project_members(project_ids):
+    project_ids = list(project_ids)
+    members_by_project = {project_id: [] for project_id in project_ids}
+    if not project_ids:
+        return members_by_project
+
+    team_rows = Team.query.filter(Team.project_id.in_(project_ids)) \
+        .order_by(Team.project_id.asc(), Team.user_email.asc()).all()
+    users = get_user_loader().load_many([row.user_email for row in team_rows])
+    users = {user.email: user for user in users}
+    for row in team_rows:
+        if row.user_email in users:
+            members_by_project[row.project_id].append(member_info(users[row.user_email]))
+    return members_by_project
+
+# ==================== PAGINATION ====================#
+# Listings are paginated on request: with `limit` or `cursor` set, rows come
+# in keyset order and the response carries the cursor of the next page (None
+# on the last one). Pages never use OFFSET, so every page costs the same.
+# `cursor_fields` maps each cursor field to its type or to its allowed values.
+def page_args(args, cursor_fields):
+    limit = args.get("limit")
+    cursor = args.get("cursor")
+    if limit is None and not cursor:
+        return None, None
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+    limit = min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+    if not cursor:
+        return limit, None
+    cursor = decode_cursor(cursor)
+    if not all(field in cursor and valid_cursor_value(cursor[field], expected) for field, expected in cursor_fields.items()):
+        raise ValueError("Invalid cursor")
+    return limit, cursor
+
+def valid_cursor_value(value, expected):
+    if isinstance(expected, type):
+        # bool is a subclass of int, but no cursor holds one
+        return isinstance(value, expected) and not isinstance(value, bool)
+    return isinstance(value, str) and value in expected
+
+# `rows` is fetched with limit + 1 so the extra row tells whether a next page exists
+def keyset_page(rows, limit, cursor_for):
+    if len(rows) > limit:
+        return rows[:limit], encode_cursor(cursor_for(rows[limit - 1]))
+    return rows, None
+
 
 test_parser = api.parser()
 test_parser.add_argument("number1", help="First number to add")
@@ -195,7 +436,6 @@ class UserRegistration(Resource):
     @api.expect(user_registration_parser)
     def post(self):
         data = request.get_json()
-        data = json.loads(json.dumps(data))
         email = data["email"]
         password = data["password"]
         first_name = data["first_name"]
@@ -207,9 +447,9 @@ class UserRegistration(Resource):
         else:
             exists=False
         if exists:
-            return json.loads(json.dumps({
+            return {
                 "error": "Email already exist"
-            }, default=default)), 422
+            }, 422
         else:
             salt = uuid.uuid4().hex
             hashed_password= hashlib.sha512((password + salt).encode('utf-8')).hexdigest()
@@ -221,16 +461,16 @@ class UserRegistration(Resource):
             db.session.commit()
             db.session.add(user_session)
             db.session.commit()
-            return json.loads(json.dumps({
+            return {
                 "email": user.email,
                 "first_name": user.first_name,
                 "last_name": user.last_name,
-            }, default=default)), 200, { 'Set-Cookie':f'SESSION_ID={session_id}; Path=/; HttpOnly; SameSite=None; Secure' }
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({
+            }, 200, { 'Set-Cookie':f'SESSION_ID={session_id}; Path=/; HttpOnly; SameSite=None; Secure' }
+        except Exception:
+            logger.exception("Registration failed")
+            return {
                 "error": "Unexpected error in registration. Please try again."
-            }, default=default)), 500
+            }, 500
 
 
 
@@ -246,7 +486,6 @@ class UserLogin(Resource):
     @api.expect(user_login_parser)
     def post(self):
         data = request.get_json()
-        data = json.loads(json.dumps(data))
         email = data["email"]
 
         try:
@@ -256,21 +495,21 @@ class UserLogin(Resource):
                 if user["hashed_password"]:
                     # Check if google log in. If fname and lname exists, user already has an account
                     if "first_name" in data and "last_name" in data:
-                        return json.loads(json.dumps({
+                        return {
                             "error": f"You already have an account. Log in with {user['email']}"
-                        }, default=default)), 401
+                        }, 401
                     # Normal log in, validate pw
                     password = data["password"]
                     hashed_db_password = user["hashed_password"]
                     db_salt = user["salt"]
                     hashed_password = hashlib.sha512((password + db_salt).encode('utf-8')).hexdigest()
                     if hashed_password != hashed_db_password:
-                        return json.loads(json.dumps({"error": "Incorrect password"}, default=default)), 422
+                        return {"error": "Incorrect password"}, 422
                 else:
                     if "first_name" not in data and "last_name" not in data:
-                        return json.loads(json.dumps({
+                        return {
                             "error": "You already have an account. Log in with Google account!"
-                        }, default=default)), 422
+                        }, 422
 
 
                 # Google login and if normal log in pw verified
@@ -278,21 +517,24 @@ class UserLogin(Resource):
                 current_session = Sessions.query.filter_by(user_email=email).first()
 
                 if current_session:
+                    rotated_session_id = current_session.session_id
                     current_session.session_id = session_id
+                    db.session.commit()
+                    invalidate_session(rotated_session_id)
                 else:
                     user_session = Sessions(email, session_id)
                     db.session.add(user_session)
-                db.session.commit()
-                print("google log in")
-                return json.loads(json.dumps({
+                    db.session.commit()
+                logger.info("Logged in", extra={"user": email})
+                return {
                     "email": user["email"],
                     "first_name": user["first_name"],
                     "last_name": user["last_name"],
-                }, default=default)), 200, { 'Set-Cookie':f'SESSION_ID={session_id}; Path=/; HttpOnly; SameSite=None; Secure' }
+                }, 200, { 'Set-Cookie':f'SESSION_ID={session_id}; Path=/; HttpOnly; SameSite=None; Secure' }
             else:
                 # Check if google log in. If fname and lname does not exist, log in type is normal
                 if "first_name" not in data and "last_name" not in data:
-                    return json.loads(json.dumps({"error": "User does not exist"}, default=default)), 422
+                    return {"error": "User does not exist"}, 422
                 else:
                     # First time google log in, register user
                     first_name = data["first_name"]
@@ -306,15 +548,15 @@ class UserLogin(Resource):
                     db.session.add(user_session)
                     db.session.commit()
 
-                    return json.loads(json.dumps({
+                    return {
                         "email": data["email"],
                         "first_name": data["first_name"],
                         "last_name": data["last_name"],
-                    }, default=default)), 200, { 'Set-Cookie':f'SESSION_ID={session_id}; Path=/; HttpOnly; SameSite=None; Secure' }
+                    }, 200, { 'Set-Cookie':f'SESSION_ID={session_id}; Path=/; HttpOnly; SameSite=None; Secure' }
 
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({"error": "Something went wrong with logging in"}, default=default)), 500
+        except Exception:
+            logger.exception("Something went wrong with logging in")
+            return {"error": "Something went wrong with logging in"}, 500
 
 @api.route("/user_logout")
 @api.doc(description="User logout")
@@ -325,10 +567,11 @@ class UserLogout(Resource):
         try:
             Sessions.query.filter_by(session_id=session_id).delete()
             db.session.commit()
-            return json.loads(json.dumps({"message": "success"}, default=default)), 200
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({"error": "Something went wrong with logging out"}, default=default)), 500
+            invalidate_session(session_id)
+            return {"message": "success"}, 200
+        except Exception:
+            logger.exception("Something went wrong with logging out")
+            return {"error": "Something went wrong with logging out"}, 500
 
 # ==================== TEAM FUNCTIONS ====================#
 
@@ -348,27 +591,17 @@ class JoinTeam(Resource):
         try:
             join_team = Team(email,team_id)
             db.session.add(join_team)
+            bump_project_versions([team_id])
             db.session.commit()
+            publish_project_event(team_id, "member_joined", user_email=email)
 
             project = Project.query.get(team_id)
             if project:
                 project = project.as_dict()
-                team = Team.query.filter_by(project_id=team_id)
-                project_members = []
-                for member in team:
-                    member = member.as_dict()
-                    member_info = User.query.get(member["user_email"])
-                    member = {
-                        "user_email": member_info.email,
-                        "fname": member_info.first_name,
-                        "lname": member_info.last_name,
-                    }
-                    project_members.append(member)
-
-                project["members"] = project_members
-            return json.loads(json.dumps(project, default=str)), 200
-        except Exception as e:
-            print(e)
+                project["members"] = load_project_members([project["project_id"]])[project["project_id"]]
+            return project, 200
+        except Exception:
+            logger.exception("Unable to join project")
             return "Error, please try again", 400
 
 #Get user teams
@@ -380,31 +613,25 @@ class GetUserTeams(Resource):
     @api.expect(get_user_teams_parser)
     def get(self):
         email = get_user_teams_parser.parse_args().get("email")
+        etag = user_projects_etag(email)
+        if not_modified(etag):
+            return not_modified_response(etag)
+
         projects_list = [] #returns list of project ids that a user is in
-        for team in Team.query.filter_by(user_email=email):
-            project = Project.query.get(team.project_id)
+        projects = Project.query.join(Team, Team.project_id == Project.project_id) \
+            .filter(Team.user_email == email) \
+            .order_by(Project.project_id.asc()).all()
+        members_by_project = load_project_members([project.project_id for project in projects])
+        for project in projects:
             project_info = {}
-            project_info["project_id"] = team.project_id
-            project_info["creator"] = project.as_dict()["creator"]
-            project_info["description"] = project.as_dict()["description"]
-            project_info["created_at"] = project.as_dict()["created_at"].strftime("%Y-%m-%d")
-            project_info["last_modified"] = project.as_dict()["last_modified"].strftime("%Y-%m-%d")
-            project_id = team.project_id
-            project_team = Team.query.filter(Team.project_id==project_id)
-            project_members = []
-            for member in project_team:
-                member = member.as_dict()
-                member_info = User.query.get(member["user_email"])
-                member = {
-                    "user_email": member_info.email,
-                    "fname": member_info.first_name,
-                    "lname": member_info.last_name,
-                }
-                project_members.append(member)
-            project_info['members'] = project_members
+            project_info["project_id"] = project.project_id
+            project_info["creator"] = project.creator
+            project_info["description"] = project.description
+            project_info["created_at"] = project.created_at.strftime("%Y-%m-%d")
+            project_info["last_modified"] = project.last_modified.strftime("%Y-%m-%d")
+            project_info['members'] = members_by_project[project.project_id]
             projects_list.append(project_info)
-            # projects_list.append(team.project_id)
-        return projects_list, 200
+        return projects_list, 200, {"ETag": f'"{etag}"'}
 
 # ==================== PROJECT FUNCTIONS ====================#
 # create_project_parser = api.parser()
@@ -427,7 +654,6 @@ class CreateProject(Resource):
     def post(self):
         new_project = api.payload
         data = request.get_json()
-        data=json.loads(json.dumps(data))
         creator = data["creator"]
         description = data["description"]
         created_at = str(datetime.today())
@@ -444,34 +670,45 @@ class CreateProject(Resource):
             db.session.commit()
 
             user = request.user
-            member_info = User.query.get(user)
-            member = {
-                "user_email": member_info.email,
-                "fname": member_info.first_name,
-                "lname": member_info.last_name,
-            }
+            members = [member_info(member) for member in get_user_loader().load_many([user])]
 
             project = Project.query.get(new_project.project_id)
             if project:
                 project = project.as_dict()
-                project['members'] = [member]
+                project['members'] = members
 
-            return json.loads(json.dumps(project, default=str)), 200
-        except Exception as e:
-            print(e)
+            return project, 200
+        except Exception:
+            logger.exception("Unable to create project")
             return "Failed", 400
 
 get_project_parser = api.parser()
 get_project_parser.add_argument("email", help="Unique email of user")
+get_project_parser.add_argument("limit", type=int, help="Projects per page; pages come with a next_cursor when set")
+get_project_parser.add_argument("cursor", help="next_cursor of the previous page")
 @api.route("/get_project")
 @api.doc(description="Get list of projects by user (email id)")
 class GetProject(Resource):
     @api.expect(get_project_parser)
     def get(self):
-        email = get_project_parser.parse_args().get("email")
-        print(email)
+        args = get_project_parser.parse_args()
+        email = args.get("email")
+        logger.debug("Listing projects", extra={"creator": email})
+        try:
+            limit, cursor = page_args(args, {"project_id": int})
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        projects = Project.query.filter_by(creator=email)
+        next_cursor = None
+        if limit is not None:
+            if cursor is not None:
+                projects = projects.filter(Project.project_id > cursor["project_id"])
+            projects = projects.order_by(Project.project_id.asc()).limit(limit + 1).all()
+            projects, next_cursor = keyset_page(projects, limit, lambda proj: {"project_id": proj.project_id})
+
         project_info = {}
-        for proj in Project.query.filter_by(creator=email):
+        for proj in projects:
             project_info[proj.project_id] = {}
             project_info[proj.project_id]["email"] = proj.as_dict()["creator"]
             project_info[proj.project_id]["description"] = proj.as_dict()["description"]
@@ -479,22 +716,38 @@ class GetProject(Resource):
             project_info[proj.project_id]["created_at"] = created_at
             last_modified = proj.as_dict()["last_modified"].strftime("%Y-%m-%d")
             project_info[proj.project_id]["last_modified"] = last_modified
+        if limit is not None:
+            return {"projects": project_info, "next_cursor": next_cursor}, 200
         if project_info == {}:
             return "No projects", 400
         return project_info, 200
 
-get_project_parser = api.parser()
+get_all_project_ids_parser = api.parser()
+get_all_project_ids_parser.add_argument("limit", type=int, help="Project ids per page; pages come with a next_cursor when set")
+get_all_project_ids_parser.add_argument("cursor", help="next_cursor of the previous page")
 @api.route("/get_all_project_ids")
 @api.doc(description="Getall project ids")
-class GetProject(Resource):
-    @api.expect(get_project_parser)
+class GetAllProjectIds(Resource):
+    @api.expect(get_all_project_ids_parser)
     def get(self):
-        project_info = []
-        for proj in Project.query.filter_by():
-            project_info.append(proj.project_id)
-        if project_info == []:
-            return "No projects", 400
-        return project_info, 200
+        args = get_all_project_ids_parser.parse_args()
+        try:
+            limit, cursor = page_args(args, {"project_id": int})
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+        project_ids = db.session.query(Project.project_id)
+        if limit is None:
+            project_info = [project_id for project_id, in project_ids]
+            if project_info == []:
+                return "No projects", 400
+            return project_info, 200
+
+        if cursor is not None:
+            project_ids = project_ids.filter(Project.project_id > cursor["project_id"])
+        project_ids = project_ids.order_by(Project.project_id.asc()).limit(limit + 1).all()
+        project_ids, next_cursor = keyset_page(project_ids, limit, lambda row: {"project_id": row.project_id})
+        return {"project_ids": [project_id for project_id, in project_ids], "next_cursor": next_cursor}, 200
 
 get_project_id_parser = api.parser()
 get_project_id_parser.add_argument("project_id", help="Unique project id")
@@ -507,32 +760,24 @@ class GetProjectByID(Resource):
         try:
             user_projects = Team.query.get((user, project_id))
             if user_projects is None:
-                return json.loads(json.dumps({"error": "Unauthorized request"}, default=default)), 403
+                return {"error": "Unauthorized request"}, 403
+
+            etag = project_etag(project_id)
+            if not_modified(etag):
+                return not_modified_response(etag)
 
             project = Project.query.get(project_id)
             if project:
                 project = project.as_dict()
-                team = Team.query.filter(Team.project_id==project_id)
-                project_members = []
-                for member in team:
-                    member = member.as_dict()
-                    member_info = User.query.get(member["user_email"])
-                    member = {
-                        "user_email": member_info.email,
-                        "fname": member_info.first_name,
-                        "lname": member_info.last_name,
-                    }
-                    project_members.append(member)
-
-                project["members"] = project_members
-                return json.loads(json.dumps(project, default=str)), 200
+                project["members"] = load_project_members([project["project_id"]])[project["project_id"]]
+                return project, 200, {"ETag": f'"{etag}"'}
             else:
-                return json.loads(json.dumps({
+                return {
                     "error": "Project id does not exist"
-                }, default=str)), 400
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({"error": "Unable to retrieve project"}, default=default)), 500
+                }, 400
+        except Exception:
+            logger.exception("Unable to retrieve project")
+            return {"error": "Unable to retrieve project"}, 500
 
 
 change_proj_details_parser = api.parser()
@@ -549,18 +794,117 @@ class ChangeProjectDetails(Resource):
         details = change_proj_details_parser.parse_args().get("details")
         try:
             proj = Project.query.get((proj_id))
-            print(proj.description, proj.details)
-            print(description, details)
+            logger.debug("Changing project details", extra={"project_id": proj_id})
             proj.description = description
             proj.details= details
+            bump_project_versions([proj_id])
             db.session.commit()
+            publish_project_event(proj_id, "project_updated")
 
-            return json.loads(json.dumps({'name' : proj.description, 'desc' : proj.details}, default=str)), 200
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({"error": "Unable to retrieve project details"}, default=default)), 500
+            return {'name' : proj.description, 'desc' : proj.details}, 200
+        except Exception:
+            logger.exception("Unable to retrieve project details")
+            return {"error": "Unable to retrieve project details"}, 500
 
 # ==================== TASK FUNCTIONS ====================#
+# ----- Task Ordering ----- #
+# In "dense" mode a task's position is its index in the column, and moves shift
+# the neighbouring rows. In "sparse" mode positions are gapped keys
+# (TASK_POSITION_GAP apart once balanced), so a move only rewrites the moved
+# task. A column is renumbered in the background when a gap gets small, and
+# inline when it runs out. Clients send and receive column indexes either way.
+def sparse_ordering():
+    return TASK_ORDERING == "sparse"
+
+def column_query(project_id, completion_status, *columns):
+    query = db.session.query(*columns) if columns else Task.query
+    return query.filter(Task.project_id == project_id) \
+        .filter(Task.completion_status == completion_status)
+
+# Moves every task of a column whose position lies in [start, end] by `offset`
+# with a single UPDATE statement. Leaving out `end` shifts the rest of the column.
+def shift_task_positions(project_id, completion_status, offset, start, end=None):
+    tasks = column_query(project_id, completion_status).filter(Task.position >= start)
+    if end is not None:
+        tasks = tasks.filter(Task.position <= end)
+    return tasks.update({Task.position: Task.position + offset}, synchronize_session=False)
+
+# Positions of the tasks that would sit directly before and after `index` in
+# the column. Rows are read with FOR UPDATE so a concurrent rebalance of the
+# column waits for this move, or this move sees the rebalanced keys.
+def neighbour_positions(project_id, completion_status, index, exclude_task_id=None):
+    column = column_query(project_id, completion_status, Task.position)
+    if exclude_task_id is not None:
+        column = column.filter(Task.task_id != exclude_task_id)
+    column = column.with_for_update()
+
+    if index <= 0:
+        after = column.order_by(Task.position.asc()).limit(1).scalar()
+        return None, after
+    rows = column.order_by(Task.position.asc()).offset(index - 1).limit(2).all()
+    if not rows:
+        return column.order_by(Task.position.desc()).limit(1).scalar(), None
+    before = rows[0][0]
+    after = rows[1][0] if len(rows) > 1 else None
+    return before, after
+
+def sparse_position(project_id, completion_status, index, exclude_task_id=None):
+    before, after = neighbour_positions(project_id, completion_status, index, exclude_task_id)
+    if after is not None and before is not None and after - before < 2:
+        rebalance_column(project_id, completion_status)
+        before, after = neighbour_positions(project_id, completion_status, index, exclude_task_id)
+    elif after is not None and before is not None and after - before <= TASK_REBALANCE_THRESHOLD:
+        schedule_rebalance(project_id, completion_status)
+
+    if before is None and after is None:
+        return 0
+    if after is None:
+        return before + TASK_POSITION_GAP
+    if before is None:
+        return after - TASK_POSITION_GAP
+    return before + (after - before) // 2
+
+# Renumbers a column to 0, GAP, 2 * GAP, ... with one executemany UPDATE.
+def rebalance_column(project_id, completion_status):
+    task_ids = column_query(project_id, completion_status, Task.task_id) \
+        .order_by(Task.position.asc(), Task.task_id.asc()) \
+        .with_for_update().all()
+    if not task_ids:
+        return 0
+    task_table = Task.__table__
+    db.session.execute(
+        task_table.update()
+            .where(task_table.c.task_id == bindparam("b_task_id"))
+            .values(position=bindparam("b_position")),
+        [{"b_task_id": task_id, "b_position": i * TASK_POSITION_GAP} for i, (task_id,) in enumerate(task_ids)]
+    )
+    return len(task_ids)
+
+pending_rebalances = set()
+pending_rebalances_lock = Lock()
+
+def schedule_rebalance(project_id, completion_status):
+    key = (int(project_id), completion_status)
+    with pending_rebalances_lock:
+        if key in pending_rebalances:
+            return
+        pending_rebalances.add(key)
+    Thread(target=run_rebalance, args=(current_app._get_current_object(), *key), daemon=True).start()
+
+def run_rebalance(app, project_id, completion_status):
+    try:
+        with app.app_context():
+            # Takes the project row lock like a move, so the renumbering cannot
+            # interleave with one even where FOR UPDATE is ignored (SQLite)
+            bump_project_versions([project_id])
+            rebalance_column(project_id, completion_status)
+            db.session.commit()
+    except Exception:
+        logger.exception("Rebalance failed", extra={"project_id": project_id, "completion_status": completion_status})
+    finally:
+        with pending_rebalances_lock:
+            pending_rebalances.discard((project_id, completion_status))
+
 # ----- Create Task ----- #
 # create_task_parser = api.parser()
 # create_task_parser.add_argument("project_id", help="Project ID")
@@ -590,15 +934,13 @@ class CreateTask(Resource):
     @api.expect(create_task_model)
     def post(self):
         data = request.get_json()
-        data = json.loads(json.dumps(data))
         project_id = data["project_id"]
         title = data["title"]
         description = data["description"]
         position = data["position"]
         created_datetime = datetime.now(tz=None)
         deadline = data["deadline"]
-        print(deadline)
-        print(type(deadline))
+        logger.debug("Creating task", extra={"project_id": project_id, "deadline": deadline})
         if deadline is not None:
             deadline = datetime.strptime(deadline, "%Y-%m-%dT%H:%M:%S.%fZ")
             deadline = deadline + timedelta(hours=8)
@@ -608,72 +950,153 @@ class CreateTask(Resource):
         assignees = data["assignees"]
         new_task = Task(project_id, title,description, position, created_datetime, deadline, completion_status)
         try:
+            if sparse_ordering():
+                new_task.position = sparse_position(project_id, completion_status, position)
             db.session.add(new_task)
             db.session.commit()
 
             for assignee in assignees:
                 new_assignees = Assignee(new_task.task_id, project_id, assignee["user_email"], assignee["fname"], assignee["lname"])
                 db.session.add(new_assignees)
+            bump_project_versions([project_id])
             db.session.commit()
+            publish_project_event(project_id, "task_created", task_id=new_task.task_id, completion_status=completion_status, position=position)
             response = {
                 **new_task.as_dict(),
                 "assignees": assignees,
             }
-            return json.loads(json.dumps(response, default=str)), 200
-
-        except Exception as e:
-            print(e)
-            error_str = traceback.format_exc()
-            return json.loads(json.dumps({"error": "Unable to create task"}, default=default)), 500
+            if sparse_ordering():
+                response["position"] = position
+            return response, 200
+
+        except Exception:
+            logger.exception("Unable to create task")
+            return {"error": "Unable to create task"}, 500
+
+# ----- Board Loader ----- #
+# Fetches a whole board in two statements: the tasks of the project ordered by
+# position, and every assignee of the project in one go. Assignees are grouped
+# by task_id in memory and tasks are bucketed by status in a single pass.
+BOARD_COLUMNS = {
+    "not started": "todo",
+    "started": "inprogress",
+    "completed": "completed",
+}
+
+def group_assignees(assignees):
+    assignees_by_task = {}
+    for assignee in assignees:
+        assignees_by_task.setdefault(assignee.task_id, []).append({
+            "user_email": assignee.user_email,
+            "fname": assignee.fname,
+            "lname": assignee.lname,
+        })
+    return assignees_by_task
+
+# `index` is the task's place in its column, sent instead of the stored key in sparse mode
+def board_task(task, assignees_by_task, index):
+    task_info = task.as_dict()
+    task_info["assignees"] = assignees_by_task.get(task.task_id, [])
+    if sparse_ordering():
+        task_info["position"] = index
+    return task_info
+
+def load_board(project_id):
+    tasks = Task.query.order_by(Task.position.asc()).filter_by(project_id=project_id).all()
+    assignees = Assignee.query.filter_by(project_id=project_id) \
+        .order_by(Assignee.task_id.asc(), Assignee.user_email.asc()).all()
+    assignees_by_task = group_assignees(assignees)
+
+    board = {column: [] for column in BOARD_COLUMNS.values()}
+    for task in tasks:
+        column = BOARD_COLUMNS.get(task.completion_status)
+        if column is None:
+            raise Exception("Invalid completion_status")
+        board[column].append(board_task(task, assignees_by_task, len(board[column])))
+    return board
+
+# Keyset condition for the tasks of a column that come after the given one.
+# Dense positions can repeat within a column (CreateTask inserts at the
+# position it is sent), so task_id breaks ties.
+def tasks_after(position, task_id):
+    return or_(Task.position > position, and_(Task.position == position, Task.task_id > task_id))
+
+# One page of the board: the first `limit` tasks of every column, or with a
+# cursor the next `limit` tasks of the column it was issued for. Each column
+# page is a range scan on (project_id, completion_status, position), and the
+# assignees of the page's tasks are loaded with one IN query.
+def load_board_page(project_id, limit, cursor=None):
+    if cursor is None:
+        columns = {status: (None, 0) for status in BOARD_COLUMNS}
+    elif cursor["status"] in BOARD_COLUMNS:
+        columns = {cursor["status"]: ((cursor["position"], cursor["task_id"]), cursor["index"])}
+    else:
+        raise ValueError("Invalid cursor")
+
+    pages = {}
+    next_cursors = {}
+    for status, (after, index) in columns.items():
+        tasks = column_query(project_id, status)
+        if after is not None:
+            tasks = tasks.filter(tasks_after(*after))
+        tasks = tasks.order_by(Task.position.asc(), Task.task_id.asc()).limit(limit + 1).all()
+        pages[status], next_cursors[BOARD_COLUMNS[status]] = keyset_page(
+            tasks, limit, lambda task: {"status": status, "position": task.position, "task_id": task.task_id, "index": index + limit}
+        )
+
+    task_ids = [task.task_id for tasks in pages.values() for task in tasks]
+    assignees = Assignee.query.filter(Assignee.task_id.in_(task_ids)) \
+        .order_by(Assignee.task_id.asc(), Assignee.user_email.asc()).all() if task_ids else []
+    assignees_by_task = group_assignees(assignees)
+
+    board = {}
+    for status, tasks in pages.items():
+        start = columns[status][1]
+        board[BOARD_COLUMNS[status]] = [board_task(task, assignees_by_task, start + i) for i, task in enumerate(tasks)]
+    return board, next_cursors
 
 # ----- Get Task By Project ID ----- #
 get_task_by_project_parser = api.parser()
 get_task_by_project_parser.add_argument("project_id", help="Enter project ID")
+get_task_by_project_parser.add_argument("limit", type=int, help="Tasks per column; columns come a page at a time with next_cursors when set")
+get_task_by_project_parser.add_argument("cursor", help="An entry of next_cursors from the previous page, to load more of that column")
 @api.route("/get_task_by_projectid")
 @api.doc(description="Get list of tasks by project (project id)")
 class GetTaskByProject(Resource):
     @api.expect(get_task_by_project_parser)
     def get(self):
-        project_id = get_task_by_project_parser.parse_args().get("project_id")
+        args = get_task_by_project_parser.parse_args()
+        project_id = args.get("project_id")
         user = request.user
-        todo = []
-        inprogress = []
-        completed = []
+        try:
+            limit, cursor = page_args(args, {"status": BOARD_COLUMNS, "position": int, "task_id": int, "index": int})
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
         try:
             user_projects = Team.query.get((user, project_id))
             if user_projects is None:
-                return json.loads(json.dumps({"error": "Unauthorized request"}, default=default)), 403
-
-            tasks = Task.query.order_by(Task.position.asc()).filter_by(project_id=project_id).all()
-            for task in tasks:
-                task = task.as_dict()
-                assignees = Assignee.query.filter_by(task_id=task["task_id"]).all()
-                all_assignees = []
-                for assignee in assignees:
-                    assignee = assignee.as_dict()
-                    del assignee["project_id"]
-                    del assignee["task_id"]
-                    all_assignees.append(assignee)
-                task["assignees"] = all_assignees
-
-                if task["completion_status"] == "not started":
-                    todo.append(task)
-                elif task["completion_status"] == "started":
-                    inprogress.append(task)
-                elif task["completion_status"] == "completed":
-                    completed.append(task)
-                else:
-                    raise Exception("Invalid completion_status")
-            return json.loads(json.dumps({
-                "tasks": {
-                    "todo": todo,
-                    "inprogress": inprogress,
-                    "completed": completed,
-                }
-            }, default=str)), 200
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({"error": "Unable to retrieve tasks"}, default=default)), 500
+                return {"error": "Unauthorized request"}, 403
+
+            etag = project_etag(project_id)
+            if not_modified(etag):
+                return not_modified_response(etag)
+
+            if limit is None:
+                return {
+                    "tasks": load_board(project_id)
+                }, 200, {"ETag": f'"{etag}"'}
+
+            board, next_cursors = load_board_page(project_id, limit, cursor)
+            return {
+                "tasks": board,
+                "next_cursors": next_cursors,
+            }, 200, {"ETag": f'"{etag}"'}
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        except Exception:
+            logger.exception("Unable to retrieve tasks")
+            return {"error": "Unable to retrieve tasks"}, 500
 
 task_model = api.model("task_model", {
     'project_id': fields.Integer(description="Project ID", required=True),
@@ -694,19 +1117,15 @@ class UpdateTask(Resource):
     @api.expect(create_task_model)
     def patch(self):
         data = request.get_json()
-        data = json.loads(json.dumps(data))
         task_id = data["task_id"]
 
         try:
             task = Task.query.get(task_id)
-            original_deadline = task.deadline
-            new_deadline = data["deadline"]
-            new_deadline_string = new_deadline.split("T")[0].strip()
-            new_deadline = datetime.strptime(new_deadline, "%Y-%m-%dT%H:%M:%S.%fZ")
+            new_deadline = datetime.strptime(data["deadline"], "%Y-%m-%dT%H:%M:%S.%fZ")
             new_deadline = new_deadline + timedelta(hours=8)
-            original_deadline = str(original_deadline).split(" ")[0]
-            original_deadline_string = original_deadline
             if task:
+                # Compared as stored, i.e. after the shift above
+                deadline_changed = new_deadline != task.deadline
                 task.description = data["description"]
                 task.title = data["title"]
                 task.deadline = new_deadline
@@ -720,42 +1139,28 @@ class UpdateTask(Resource):
                         db.session.add(new_assignee)
                 # delete assignees who are unassigned
                 updated_assignees = [assignee["user_email"] for assignee in updated_assignees]
-                print(updated_assignees)
+                logger.debug("Updating assignees", extra={"task_id": task_id, "assignees": updated_assignees})
                 for current_assignee in current_assignees:
                     if current_assignee not in updated_assignees:
                         Assignee.query.filter_by(task_id=task_id).filter_by(user_email=current_assignee).delete()
+                project_id = task.project_id
+                bump_project_versions([project_id])
                 db.session.commit()
-                new_deadline = str(original_deadline).split(" ")[0]
-                if original_deadline != new_deadline_string:
-                    for new_assignee_email in updated_assignees:
-                        data = {
-                        'Messages': [
-                                {
-                                "From": {
-                                    "Email": "taskucci@gmail.com",
-                                    "Name": "Taskucci"
-                                },
-                                "To": [
-                                    {
-                                    "Email": f"{new_assignee_email}",
-                                    "Name": f"{new_assignee_email}"
-                                    }
-                                ],
-                                "Subject": f"{task.title}: Task Deadline Updated",
-                                "TextPart": "Thank you for using Taskucci project management board - where efficiency meets usability",
-                                "HTMLPart": f"Dear {new_assignee_email},<br><br> Please check your Taskucci application to view updated task deadline for {task.title}. Thank you!",
-                                "CustomID": "Task deadline updated"
-                                }
-                            ]
-                        }
-                return json.loads(json.dumps({"message":"success"}, default=default)), 200
+                publish_project_event(project_id, "task_updated", task_id=task_id)
+                if deadline_changed and updated_assignees:
+                    # Delivered by the notification workers; the edit does not wait on email
+                    notification_queue.enqueue(deadline_updated_payload(
+                        data["title"], updated_assignees, NOTIFICATION_SENDER, NOTIFICATION_SENDER_NAME
+                    ))
+                return {"message":"success"}, 200
             else:
-                return json.loads(json.dumps({"error": f"Task {task_id} does not exist"}, default=default)), 400
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({"error": "Unable to update tasks"}, default=default)), 500
+                return {"error": f"Task {task_id} does not exist"}, 400
+        except Exception:
+            logger.exception("Unable to update tasks")
+            return {"error": "Unable to update tasks"}, 500
 
 # ----- Update Task Position ----- #
+
 task_position_model = api.model("task_position_model", {
     'project_id': fields.Integer(description="Project ID", required=True),
     'task_id': fields.Integer(description="Task ID", required=True),
@@ -770,49 +1175,55 @@ class UpdateTaskPosition(Resource):
     @api.expect(task_position_model)
     def patch(self):
         data = request.get_json()
-        data = json.loads(json.dumps(data))
         task_id = data["task_id"]
         project_id = data["project_id"]
         new_position = data["new_position"]
         new_status = data["new_status"]
 
         try:
-            task = Task.query.get(task_id)
+            # Bumping the version first takes the project row lock, so moves on
+            # one board run one at a time, and the locking read below sees the
+            # positions left by the previous move
+            bump_project_versions([project_id])
+            task = Task.query.with_for_update().get(task_id)
 
             old_position = task.position
-            if task.completion_status == new_status:
-                selected_tasks = Task.query.order_by(Task.position.asc()).filter_by(project_id=project_id).filter_by(completion_status=new_status).all()
+            if sparse_ordering():
+                task.position = sparse_position(project_id, new_status, new_position, exclude_task_id=task.task_id)
+                task.completion_status = new_status
+            else:
+                # The index may come from a stale board; past the end of the
+                # column it would leave a gap, so it is clamped to the end
+                column_size = column_query(project_id, new_status, func.count(Task.task_id)).scalar()
+                if task.completion_status == new_status:
+                    column_size -= 1
+                new_position = max(0, min(new_position, column_size))
+
+                if task.completion_status == new_status:
+                    if old_position > new_position:
+                        shift_task_positions(project_id, new_status, 1, new_position, old_position - 1)
+                    else:
+                        shift_task_positions(project_id, new_status, -1, old_position + 1, new_position)
 
-                if old_position > new_position:
-                    for i in range(new_position, old_position):
-                        current_task = Task.query.get(selected_tasks[i].task_id)
-                        selected_tasks[i].position = selected_tasks[i].position + 1
+                    task.position = new_position
                 else:
-                    for i in range(old_position+1, new_position+1):
-                        selected_tasks[i].position = selected_tasks[i].position - 1
+                    # close the gap in the old column
+                    old_status = task.completion_status
+                    shift_task_positions(project_id, old_status, -1, old_position + 1)
 
-                task.position = new_position
-            else:
-                # get tasks with old status
-                old_status = task.completion_status
-                old_status_tasks = Task.query.order_by(Task.position.asc()).filter_by(project_id=project_id).filter_by(completion_status=old_status).all()
-                for i in range(old_position+1, len(old_status_tasks)):
-                    old_status_tasks[i].position = old_status_tasks[i].position - 1
-
-                # get tasks with new status
-                new_status_tasks = Task.query.order_by(Task.position.asc()).filter_by(project_id=project_id).filter_by(completion_status=new_status).all()
-                for i in range(new_position, len(new_status_tasks)):
-                    new_status_tasks[i].position = new_status_tasks[i].position + 1
-
-                # change status of task to new status
-                task.position = new_position
-                task.completion_status = new_status
+                    # make room in the new column
+                    shift_task_positions(project_id, new_status, 1, new_position)
+
+                    # change status of task to new status
+                    task.position = new_position
+                    task.completion_status = new_status
             db.session.commit()
-            return json.loads(json.dumps({"message": "success"}, default=default)), 200
+            publish_project_event(project_id, "task_moved", task_id=task_id, completion_status=new_status, position=new_position)
+            return {"message": "success"}, 200
 
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({"error": "Unable to update tasks"}, default=default)), 500
+        except Exception:
+            logger.exception("Unable to update tasks")
+            return {"error": "Unable to update tasks"}, 500
 
 # ----- Delete Task  ----- #
 delete_task_parser = api.parser()
@@ -825,24 +1236,628 @@ class DeleteTask(Resource):
         task_id = delete_task_parser.parse_args().get("task_id")
 
         try:
-            task = Task.query.get(task_id)
+            # Locked like a move, see UpdateTaskPosition
+            project_id = db.session.query(Task.project_id).filter(Task.task_id == task_id).scalar()
+            bump_project_versions([project_id])
+            task = Task.query.with_for_update().get(task_id)
             task_position = task.position
             status = task.completion_status
-            project_id = task.project_id
 
-            tasks = Task.query.order_by(Task.position.asc()).filter_by(project_id=project_id).filter_by(completion_status=status).all()
-            for i in range(task_position+1, len(tasks)):
-                tasks[i].position = tasks[i].position - 1
+            if not sparse_ordering():
+                shift_task_positions(project_id, status, -1, task_position + 1)
             Assignee.query.filter_by(task_id=task_id).delete()
             Task.query.filter_by(task_id=task_id).delete()
 
             db.session.commit()
-            return json.loads(json.dumps({"message":"success"}, default=default)), 200
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({"error":"Unable to delete task"}, default=default)), 500
+            publish_project_event(project_id, "task_deleted", task_id=int(task_id))
+            return {"message":"success"}, 200
+        except Exception:
+            logger.exception("Unable to delete task")
+            return {"error":"Unable to delete task"}, 500
+
+# ----- Bulk Create / Update Tasks ----- #
+bulk_task_model = api.model("bulk_task_model", {
+    'project_id': fields.Integer(description="Project ID", required=True),
+    'title': fields.String(description="Title of task", required=True),
+    'description': fields.String(description="Description of task"),
+    'deadline': fields.DateTime(description="Deadline of task", required=True),
+    'completion_status': fields.String(description="Status of task", required=True),
+    'assignees': fields.List(fields.Nested(user_fields)),
+})
+bulk_create_tasks_model = api.model("bulk_create_tasks_model", {
+    'tasks': fields.List(fields.Nested(bulk_task_model), required=True),
+})
+bulk_task_update_model = api.model("bulk_task_update_model", {
+    'task_id': fields.Integer(description="Task ID", required=True),
+    'title': fields.String(description="Title of task"),
+    'description': fields.String(description="Description of task"),
+    'deadline': fields.DateTime(description="Deadline of task"),
+    'assignees': fields.List(fields.Nested(user_fields)),
+})
+bulk_update_tasks_model = api.model("bulk_update_tasks_model", {
+    'tasks': fields.List(fields.Nested(bulk_task_update_model), required=True),
+})
+
+def parse_deadline(deadline):
+    if deadline is None:
+        return None
+    return datetime.strptime(deadline, "%Y-%m-%dT%H:%M:%S.%fZ") + timedelta(hours=8)
+
+def unauthorized_projects(user, project_ids):
+    member_of = db.session.query(Team.project_id) \
+        .filter(Team.user_email == user) \
+        .filter(Team.project_id.in_(project_ids)).all()
+    return set(project_ids) - {project_id for project_id, in member_of}
+
+# Next free position at the end of each column of the given projects, read with
+# one grouped query. Rows are locked so concurrent imports into the same
+# column do not hand out the same positions.
+def next_column_positions(project_ids):
+    columns = db.session.query(Task.project_id, Task.completion_status, func.count(), func.max(Task.position)) \
+        .filter(Task.project_id.in_(project_ids)) \
+        .group_by(Task.project_id, Task.completion_status) \
+        .with_for_update().all()
+    positions = {}
+    for project_id, completion_status, no_tasks, last_position in columns:
+        if sparse_ordering():
+            positions[(project_id, completion_status)] = last_position + TASK_POSITION_GAP
+        else:
+            # Same as the count in a consistent column, and never reuses a position otherwise
+            positions[(project_id, completion_status)] = max(no_tasks, last_position + 1)
+    return positions
+
+# Inserts task rows with one executemany and returns their ids in order. MySQL
+# does not return the ids of an executemany insert, but the rows' positions,
+# handed out under the project row lock, are unique in their columns and
+# identify the new rows: one range query per column reads the ids back.
+def insert_tasks(rows):
+    db.session.execute(Task.__table__.insert(), rows)
+    columns = {}
+    for task in rows:
+        column = (task["project_id"], task["completion_status"])
+        first, last = columns.get(column, (task["position"], task["position"]))
+        columns[column] = (min(first, task["position"]), max(last, task["position"]))
+    inserted = db.session.query(Task.task_id, Task.project_id, Task.completion_status, Task.position).filter(or_(*[
+        and_(Task.project_id == project_id, Task.completion_status == status, Task.position.between(first, last))
+        for (project_id, status), (first, last) in columns.items()
+    ])).all()
+    task_ids = {(project_id, status, position): task_id for task_id, project_id, status, position in inserted}
+    if len(task_ids) != len(rows) or len(inserted) != len(rows):
+        raise ValueError("Column positions changed during the insert")
+    return [task_ids[(task["project_id"], task["completion_status"], task["position"])] for task in rows]
+
+def insert_assignees(rows):
+    if rows:
+        db.session.execute(Assignee.__table__.insert(), rows)
+
+@api.route("/tasks/bulk")
+@api.doc(description="Create or update many tasks in one transaction")
+class BulkTasks(Resource):
+    @api.expect(bulk_create_tasks_model)
+    def post(self):
+        data = request.get_json()
+        tasks = data["tasks"]
+        user = request.user
+        if not tasks:
+            return {"task_ids": []}, 200
+
+        for task in tasks:
+            if task.get("completion_status") not in BOARD_COLUMNS or not task.get("title") or not str(task.get("project_id")).isdigit() \
+                    or not task.get("deadline"):
+                return {"error": "Every task needs a project_id, title, deadline and valid completion_status"}, 400
+            # Rows are matched back to their ids by project_id, see insert_tasks
+            task["project_id"] = int(task["project_id"])
+            try:
+                task["deadline"] = parse_deadline(task["deadline"])
+            except (TypeError, ValueError):
+                return {"error": "Invalid deadline"}, 400
+
+        try:
+            project_ids = {task["project_id"] for task in tasks}
+            if unauthorized_projects(user, project_ids):
+                return {"error": "Unauthorized request"}, 403
+
+            # New tasks are appended to their column in input order. The
+            # version bump comes first so the column ends are read under the
+            # project row lock, as for moves.
+            bump_project_versions(project_ids)
+            positions = next_column_positions(project_ids)
+            step = TASK_POSITION_GAP if sparse_ordering() else 1
+            created_datetime = datetime.now(tz=None)
+            task_rows = []
+            for task in tasks:
+                column = (task["project_id"], task["completion_status"])
+                position = positions.get(column, 0)
+                positions[column] = position + step
+                description = task.get("description")
+                if description is None:
+                    description = "<No description entered>"
+                task_rows.append({
+                    "project_id": task["project_id"],
+                    "title": task["title"],
+                    "description": description,
+                    "position": position,
+                    "created_datetime": created_datetime,
+                    "deadline": task["deadline"],
+                    "completion_status": task["completion_status"],
+                })
+
+            # Tasks and assignees each go in as one executemany insert, as in
+            # BoardImporter
+            task_ids = insert_tasks(task_rows)
+            insert_assignees([
+                {
+                    "task_id": task_id,
+                    "project_id": task["project_id"],
+                    "user_email": assignee["user_email"],
+                    "fname": assignee["fname"],
+                    "lname": assignee["lname"],
+                }
+                for task, task_id in zip(tasks, task_ids)
+                for assignee in task.get("assignees") or []
+            ])
+            db.session.commit()
+            for project_id in project_ids:
+                publish_project_event(project_id, "tasks_created", task_ids=[task_id for task, task_id in zip(tasks, task_ids) if task["project_id"] == project_id])
+            return {"task_ids": task_ids}, 200
+        except Exception:
+            db.session.rollback()
+            logger.exception("Unable to create tasks")
+            return {"error": "Unable to create tasks"}, 500
+
+    @api.expect(bulk_update_tasks_model)
+    def patch(self):
+        data = request.get_json()
+        updates = data["tasks"]
+        user = request.user
+        if not updates:
+            return {"task_ids": []}, 200
+        for update in updates:
+            # task.deadline is NOT NULL, so a deadline can be changed but not removed
+            if "deadline" in update:
+                try:
+                    update["deadline"] = parse_deadline(update["deadline"] or "")
+                except (TypeError, ValueError):
+                    return {"error": "Invalid deadline"}, 400
+
+        try:
+            task_ids = [update["task_id"] for update in updates]
+            tasks = {task.task_id: task for task in Task.query.filter(Task.task_id.in_(task_ids)).all()}
+            for task_id in task_ids:
+                if task_id not in tasks:
+                    return {"error": f"Task {task_id} does not exist"}, 400
+            if unauthorized_projects(user, {task.project_id for task in tasks.values()}):
+                return {"error": "Unauthorized request"}, 403
+
+            current_assignees = {}
+            for assignee in Assignee.query.filter(Assignee.task_id.in_(task_ids)).all():
+                current_assignees.setdefault(assignee.task_id, set()).add(assignee.user_email)
+
+            removed_assignees = []
+            added_assignees = []
+            for update in updates:
+                task = tasks[update["task_id"]]
+                if "title" in update:
+                    task.title = update["title"]
+                if "description" in update:
+                    task.description = update["description"]
+                if "deadline" in update:
+                    task.deadline = update["deadline"]
+                if "assignees" in update:
+                    current = current_assignees.get(task.task_id, set())
+                    updated = {assignee["user_email"] for assignee in update["assignees"]}
+                    removed_assignees += [(task.task_id, email) for email in current - updated]
+                    added_assignees += [
+                        {
+                            "task_id": task.task_id,
+                            "project_id": task.project_id,
+                            "user_email": assignee["user_email"],
+                            "fname": assignee["fname"],
+                            "lname": assignee["lname"],
+                        }
+                        for assignee in update["assignees"] if assignee["user_email"] not in current
+                    ]
+
+            if removed_assignees:
+                Assignee.query.filter(tuple_(Assignee.task_id, Assignee.user_email).in_(removed_assignees)) \
+                    .delete(synchronize_session=False)
+            insert_assignees(added_assignees)
+            task_projects = {task_id: task.project_id for task_id, task in tasks.items()}
+            bump_project_versions(set(task_projects.values()))
+            db.session.commit()
+            for project_id in set(task_projects.values()):
+                publish_project_event(project_id, "tasks_updated", task_ids=[task_id for task_id in task_ids if task_projects[task_id] == project_id])
+            return {"task_ids": task_ids}, 200
+        except Exception:
+            db.session.rollback()
+            logger.exception("Unable to update tasks")
+            return {"error": "Unable to update tasks"}, 500
+
+# ----- Board Import ----- #
+# Imports the records of board_import.read_records in one transaction, so a
+# failure anywhere leaves nothing behind. Tasks are appended to their columns
+# with positions handed out under the project row lock, and are inserted
+# IMPORT_BATCH_SIZE at a time with executemany. Team membership and assignee
+# names are looked up once per project and once per email.
+class BoardImporter:
+    def __init__(self, user, batch_size=None, progress=None):
+        self.user = user
+        self.batch_size = batch_size or IMPORT_BATCH_SIZE
+        self.progress = progress
+        self.created_projects = {}
+        self.current_project = None
+        self.team_members = set()
+        self.allowed_projects = {}
+        self.positions = {}
+        self.user_names = {}
+        self.pending = []
+        self.counts = {"projects": 0, "members": 0, "tasks": 0, "assignees": 0}
+
+    def run(self, records):
+        for line, record in records:
+            getattr(self, f"add_{record['type']}")(line, record)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+        self.flush()
+        return self.counts
+
+    def add_project(self, line, record):
+        now = datetime.now()
+        project_id = db.session.execute(Project.__table__.insert().values(
+            creator=self.user,
+            description=record["description"],
+            details=record.get("details") or "",
+            created_at=now,
+            last_modified=now,
+        )).inserted_primary_key[0]
+        db.session.execute(Team.__table__.insert().values(user_email=self.user, project_id=project_id))
+        self.created_projects[str(record["project_id"])] = project_id
+        self.allowed_projects[project_id] = True
+        self.team_members.add((project_id, self.user))
+        for status in BOARD_COLUMNS:
+            self.positions[(project_id, status)] = 0
+        self.current_project = project_id
+        self.counts["projects"] += 1
+
+    def add_member(self, line, record):
+        if self.current_project is None:
+            raise BoardImportError(line, "members must follow a project record")
+        email = record["user_email"]
+        if (self.current_project, email) in self.team_members:
+            return
+        self.load_user_names([email])
+        if email not in self.user_names:
+            raise BoardImportError(line, f"unknown user {email}")
+        db.session.execute(Team.__table__.insert().values(user_email=email, project_id=self.current_project))
+        self.team_members.add((self.current_project, email))
+        self.counts["members"] += 1
+
+    def add_task(self, line, record):
+        project_id = self.resolve_project(line, record["project_id"])
+        column = (project_id, record["completion_status"])
+        position = self.positions.get(column, 0)
+        self.positions[column] = position + (TASK_POSITION_GAP if sparse_ordering() else 1)
+        self.pending.append((line, {
+            "project_id": project_id,
+            "title": record["title"],
+            "description": record["description"],
+            "position": position,
+            "created_datetime": datetime.now(),
+            "deadline": record["deadline"],
+            "completion_status": record["completion_status"],
+        }, record["assignees"]))
+
+    def resolve_project(self, line, source_id):
+        if str(source_id) in self.created_projects:
+            return self.created_projects[str(source_id)]
+        try:
+            project_id = int(source_id)
+        except ValueError:
+            raise BoardImportError(line, f"unknown project {source_id}")
+        if project_id not in self.allowed_projects:
+            allowed = Team.query.get((self.user, project_id)) is not None
+            self.allowed_projects[project_id] = allowed
+            if allowed:
+                # Locks the project row until the import commits, see UpdateTaskPosition
+                bump_project_versions([project_id])
+                self.positions.update(next_column_positions([project_id]))
+        if not self.allowed_projects[project_id]:
+            raise BoardImportError(line, f"not a member of project {project_id}")
+        return project_id
+
+    def load_user_names(self, emails):
+        missing = {email for email in emails if email not in self.user_names}
+        if missing:
+            for email, first_name, last_name in db.session.query(User.email, User.first_name, User.last_name) \
+                    .filter(User.email.in_(missing)):
+                self.user_names[email] = (first_name, last_name)
+
+    def flush(self):
+        if not self.pending:
+            return
+        self.load_user_names([assignee["user_email"] for _, _, assignees in self.pending for assignee in assignees])
+        try:
+            task_ids = insert_tasks([task for _, task, _ in self.pending])
+        except ValueError:
+            raise BoardImportError(self.pending[0][0], "column positions changed during the import")
+
+        assignee_rows = []
+        for (line, task, assignees), task_id in zip(self.pending, task_ids):
+            for assignee in assignees:
+                email = assignee["user_email"]
+                if email not in self.user_names:
+                    raise BoardImportError(line, f"unknown user {email}")
+                first_name, last_name = self.user_names[email]
+                assignee_rows.append({
+                    "task_id": task_id,
+                    "project_id": task["project_id"],
+                    "user_email": email,
+                    "fname": assignee.get("fname") or first_name,
+                    "lname": assignee.get("lname") or last_name,
+                })
+        insert_assignees(assignee_rows)
+
+        self.counts["tasks"] += len(self.pending)
+        self.counts["assignees"] += len(assignee_rows)
+        self.pending = []
+        if self.progress is not None:
+            self.progress(self.counts)
+
+    def touched_projects(self):
+        return [project_id for project_id, allowed in self.allowed_projects.items() if allowed]
+
+def import_boards(records, user, batch_size=None, progress=None):
+    importer = BoardImporter(user, batch_size, progress)
+    try:
+        counts = importer.run(records)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    for project_id in importer.touched_projects():
+        publish_project_event(project_id, "tasks_imported")
+    return counts
+
+import_parser = api.parser()
+import_parser.add_argument("format", location="args", choices=("ndjson", "csv"), help="Defaults to csv for a text/csv body and ndjson otherwise")
+@api.route("/projects/import")
+@api.doc(description="Import projects and tasks from an NDJSON or CSV request body, see board_import.py")
+class ImportBoards(Resource):
+    @api.expect(import_parser)
+    def post(self):
+        fmt = import_parser.parse_args().get("format") or ("csv" if request.mimetype == "text/csv" else "ndjson")
+        user = request.user
+        started = datetime.now()
+
+        def progress(counts):
+            logger.info("Import progress", extra={"tasks": counts["tasks"], "assignees": counts["assignees"]})
+
+        # The body is read line by line as the import goes, never as a whole
+        lines = (line.decode("utf-8") for line in request.stream)
+        try:
+            counts = import_boards(read_records(lines, fmt), user, progress=progress)
+        except BoardImportError as e:
+            return {"error": f"Nothing was imported: {e}", "line": e.line}, 400
+        except Exception:
+            logger.exception("Unable to import")
+            return {"error": "Unable to import"}, 500
+        return {
+            **counts,
+            "seconds": round((datetime.now() - started).total_seconds(), 3),
+        }, 200
+
+# ----- Project Events ----- #
+# Streams change events for one project as server-sent events. Each open
+# stream holds a worker thread, so serve through gevent_app.py (or at least
+# threaded workers) when many boards are open.
+@api.route("/projects/<int:project_id>/events")
+@api.doc(description="Server-sent events for task and membership changes in a project")
+class ProjectEvents(Resource):
+    def get(self, project_id):
+        user = request.user
+        if Team.query.get((user, project_id)) is None:
+            return {"error": "Unauthorized request"}, 403
+
+        def stream():
+            subscription = event_hub.subscribe(project_channel(project_id))
+            try:
+                yield ": connected\n\n"
+                while True:
+                    event = subscription.get(timeout=EVENTS_HEARTBEAT)
+                    yield format_sse(event) if event is not None else ": keep-alive\n\n"
+            finally:
+                event_hub.unsubscribe(subscription)
+
+        return Response(stream(), mimetype="text/event-stream", headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        })
+
+# ----- Project Export ----- #
+# Streams a project as NDJSON: one "project" line, one "member" line per team
+# member, then one "task" line per task with its assignees, in board order.
+# Each column is read in keyset windows of EXPORT_CHUNK_SIZE tasks on
+# (position, task_id), with the window's assignees loaded by one IN query.
+# mysql-connector buffers every result set on the client, so the windows are
+# what keeps memory flat however large the board is.
+EXPORT_TASK_COLUMNS = [column for column in Task.__table__.columns]
+
+def export_task_windows(project_id, completion_status):
+    after = None
+    while True:
+        tasks = column_query(project_id, completion_status, *EXPORT_TASK_COLUMNS)
+        if after is not None:
+            tasks = tasks.filter(tasks_after(after.position, after.task_id))
+        tasks = tasks.order_by(Task.position.asc(), Task.task_id.asc()).limit(EXPORT_CHUNK_SIZE).all()
+        if not tasks:
+            return
+        yield tasks
+        if len(tasks) < EXPORT_CHUNK_SIZE:
+            return
+        after = tasks[-1]
+
+def export_task_lines(project_id):
+    for completion_status in sorted(BOARD_COLUMNS):
+        index = 0
+        for tasks in export_task_windows(project_id, completion_status):
+            assignees = db.session.query(Assignee.task_id, Assignee.user_email, Assignee.fname, Assignee.lname) \
+                .filter(Assignee.task_id.in_([task.task_id for task in tasks])) \
+                .order_by(Assignee.task_id.asc(), Assignee.user_email.asc()).all()
+            assignees_by_task = group_assignees(assignees)
+            for task in tasks:
+                line = {"type": "task", **task._asdict(), "assignees": assignees_by_task.get(task.task_id, [])}
+                if sparse_ordering():
+                    line["position"] = index
+                index += 1
+                yield dumps(line) + b"\n"
+
+# Task lines are sent in blocks of about 64 KiB rather than one write each
+def buffered(lines, size=65536):
+    block = []
+    block_size = 0
+    for line in lines:
+        block.append(line)
+        block_size += len(line)
+        if block_size >= size:
+            yield b"".join(block)
+            block = []
+            block_size = 0
+    if block:
+        yield b"".join(block)
+
+def export_project(project_id):
+    # The project and members go out before the task query is sent
+    project = Project.query.get(project_id)
+    header = [dumps({"type": "project", **project.as_dict()}) + b"\n"]
+    for member in load_project_members([project_id])[project_id]:
+        header.append(dumps({"type": "member", **member}) + b"\n")
+    yield b"".join(header)
+    yield from buffered(export_task_lines(project_id))
+
+@api.route("/projects/<int:project_id>/export")
+@api.doc(description="Export a project, its members and its tasks as NDJSON")
+class ProjectExport(Resource):
+    def get(self, project_id):
+        user = request.user
+        if Team.query.get((user, project_id)) is None:
+            return {"error": "Unauthorized request"}, 403
+
+        return Response(stream_with_context(export_project(project_id)), mimetype="application/x-ndjson", headers={
+            "Content-Disposition": f'attachment; filename="project-{project_id}.ndjson"',
+            "X-Accel-Buffering": "no",
+        })
 
 # ----- START DASHBOARD ----- #
+# The dashboard is computed with a fixed number of statements: one for the
+# user's projects and two aggregates over the user's assigned tasks, grouped by
+# project and status, and by project and deadline date for the current week.
+def empty_dashboard_stats(upcoming=False):
+    stats = {
+        "no_completed_tasks": 0,
+        "no_incomplete_tasks": 0,
+        "no_overdue_tasks": 0,
+        "total_tasks": 0,
+    }
+    if upcoming:
+        stats["no_upcoming_tasks"] = 0
+    return {
+        **stats,
+        "tasks_completion_status": {
+            "todo": 0,
+            "in_progress": 0,
+            "completed": 0
+        },
+        "no_due_this_week": [0,0,0,0,0,0,0]
+    }
+
+def compute_dashboard(user):
+    current_date = datetime.now()
+    start_of_week = current_date - timedelta(days=current_date.weekday())
+    end_of_week = start_of_week + timedelta(days=6)
+
+    overall = empty_dashboard_stats()
+    stats_by_project = {}
+    user_projects = db.session.query(Project.project_id, Project.description) \
+        .join(Team, Team.project_id == Project.project_id) \
+        .filter(Team.user_email == user).all()
+    for project_id, description in user_projects:
+        stats_by_project[project_id] = {
+            "description": description,
+            **empty_dashboard_stats(upcoming=True),
+        }
+
+    is_overdue = case(
+        ((Task.deadline < current_date) & (Task.completion_status != "completed"), 1),
+        else_=0
+    )
+    # The earliest deadline still to pass is when the overdue counts change next
+    upcoming_deadline = case(
+        ((Task.deadline >= current_date) & (Task.completion_status != "completed"), Task.deadline),
+    )
+    status_counts = db.session.query(
+            Task.project_id, Task.completion_status, func.count(), func.sum(is_overdue), func.min(upcoming_deadline)
+        ) \
+        .join(Assignee, Assignee.task_id == Task.task_id) \
+        .filter(Assignee.user_email == user) \
+        .group_by(Task.project_id, Task.completion_status).all()
+
+    # Results stay valid until midnight (which is also when a new week starts)
+    # or until the next deadline passes, whichever comes first
+    valid_until = datetime.combine(current_date.date() + timedelta(days=1), datetime.min.time())
+    for project_id, status, no_tasks, no_overdue, next_deadline in status_counts:
+        if next_deadline is not None and next_deadline < valid_until:
+            valid_until = next_deadline
+        no_overdue = int(no_overdue or 0)
+        overall["total_tasks"] += no_tasks
+        overall["no_overdue_tasks"] += no_overdue
+        project = stats_by_project.get(project_id) or empty_dashboard_stats(upcoming=True)
+        project["total_tasks"] += no_tasks
+        project["no_overdue_tasks"] += no_overdue
+
+        if status == "completed":
+            overall["no_completed_tasks"] += no_tasks
+            overall["tasks_completion_status"]["completed"] += no_tasks
+            project["no_completed_tasks"] += no_tasks
+            project["tasks_completion_status"]["completed"] += no_tasks
+        else:
+            overall["no_incomplete_tasks"] += no_tasks
+
+            if status == "started":
+                overall["tasks_completion_status"]["in_progress"] += no_tasks
+                project["no_incomplete_tasks"] += no_tasks
+                project["tasks_completion_status"]["in_progress"] += no_tasks
+            else:
+                overall["tasks_completion_status"]["todo"] += no_tasks
+                project["no_upcoming_tasks"] += no_tasks
+
+                if status == "not started":
+                    project["no_incomplete_tasks"] += no_tasks
+                    project["tasks_completion_status"]["todo"] += no_tasks
+                else:
+                    project["tasks_completion_status"]["completed"] += no_tasks
+
+    # DATE() is used instead of a weekday function so the grouping works on
+    # both MySQL and SQLite; at most 7 dates per project come back.
+    deadline_date = func.date(Task.deadline)
+    due_counts = db.session.query(Task.project_id, deadline_date, func.count()) \
+        .join(Assignee, Assignee.task_id == Task.task_id) \
+        .filter(Assignee.user_email == user) \
+        .filter(Task.deadline.between(start_of_week, end_of_week)) \
+        .group_by(Task.project_id, deadline_date).all()
+
+    for project_id, due_date, no_tasks in due_counts:
+        if isinstance(due_date, str):
+            due_date = date.fromisoformat(due_date)
+        day = due_date.weekday()
+        overall["no_due_this_week"][day] += no_tasks
+        if project_id in stats_by_project:
+            stats_by_project[project_id]["no_due_this_week"][day] += no_tasks
+
+    return {
+        "total": overall,
+        **stats_by_project
+    }, valid_until
+
 @api.route("/dashboard", methods=["GET"])
 class Dashboard(Resource):
     def get(self):
@@ -862,122 +1877,113 @@ class Dashboard(Resource):
 
         user = request.user
         try:
-            user_tasks = Assignee.query.filter_by(user_email=user)
-            total_tasks = user_tasks.count()
-
-            overall = {
-                "no_completed_tasks": 0,
-                "no_incomplete_tasks": 0,
-                "no_overdue_tasks": 0,
-                "total_tasks": total_tasks,
-                "tasks_completion_status": {
-                    "todo": 0,
-                    "in_progress": 0,
-                    "completed": 0
-                },
-                "no_due_this_week": [0,0,0,0,0,0,0]
-            }
+            # Cached results are only served while the user's projects are at
+            # the same versions, so any write to them, in any worker, or the
+            # user joining a team invalidates the entry
+            projects_version = user_projects_etag(user)
+            cached = dashboard_cache.get(user, valid=lambda entry: entry[0] == projects_version)
+            if cached is not None:
+                return cached[1], 200
 
-            stats_by_project = {}
-            user_teams = Team.query.filter_by(user_email=user)
-
-            for team in user_teams.all():
-                project = Project.query.get(team.project_id)
-                stats_by_project[project.project_id] = {
-                    "description": project.description,
-                    "no_completed_tasks": 0,
-                    "no_incomplete_tasks": 0,
-                    "no_overdue_tasks": 0,
-                    "total_tasks": 0,
-                    "no_upcoming_tasks": 0,
-                    "tasks_completion_status": {
-                        "todo": 0,
-                        "in_progress": 0,
-                        "completed": 0
-                    },
-                    "no_due_this_week": [0,0,0,0,0,0,0]
-                }
+            result, valid_until = compute_dashboard(user)
+            ttl = min(dashboard_cache.ttl, (valid_until - datetime.now()).total_seconds())
+            if ttl > 0:
+                dashboard_cache.set(user, (projects_version, result), ttl=ttl)
+            return result, 200
 
-            for task in user_tasks.all():
-                task_info = Task.query.get(task.task_id)
-                project_id = task_info.project_id
-                stats_by_project[project_id]["total_tasks"] += 1
-
-                if task_info.completion_status == 'completed':
-                    overall["no_completed_tasks"] += 1
-                    overall["tasks_completion_status"]["completed"] += 1
-                    # by project
-                    stats_by_project[project_id]["no_completed_tasks"] += 1
-                    stats_by_project[project_id]["tasks_completion_status"]["completed"] += 1
-                else:
-                    overall["no_incomplete_tasks"] += 1
 
-                    if task_info.completion_status == "started":
-                        overall["tasks_completion_status"]["in_progress"] += 1
-
-                        stats_by_project[project_id]["no_incomplete_tasks"] += 1
-                        stats_by_project[project_id]["tasks_completion_status"]["in_progress"] += 1
-                    else:
-                        overall["tasks_completion_status"]["todo"] += 1
-                        stats_by_project[project_id]["no_upcoming_tasks"] += 1
-
-                        if task_info.completion_status == "not started":
-                            stats_by_project[project_id]["no_incomplete_tasks"] += 1
-                            stats_by_project[project_id]["tasks_completion_status"]["todo"] += 1
-                        else:
-                            stats_by_project[project_id]["tasks_completion_status"]["completed"] += 1
-
-                if task_info.deadline:
-                    current_date = datetime.now()
-                    start_of_week = current_date - timedelta(days=current_date.weekday())
-                    end_of_week = start_of_week + timedelta(days=6)
-                    deadline = task_info.deadline
-
-                    if current_date > deadline and task_info.completion_status != "completed":
-                        overall["no_overdue_tasks"] += 1
-                        stats_by_project[project_id]["no_overdue_tasks"] += 1
-
-                    if deadline >= start_of_week and deadline <= end_of_week:
-                        day = deadline.weekday()
-                        overall["no_due_this_week"][day] += 1
-                        stats_by_project[project_id]["no_due_this_week"][day] += 1
-
-            result = {
-                "total": overall,
-                **stats_by_project
-            }
-
-            return json.loads(json.dumps(result, default=str)), 200
+        except Exception:
+            logger.exception("Something went wrong while retrieving dashboard")
+            return {"error": "Something went wrong while retrieving dashboard"}, 500
 
+# ----- END DASHBOARD ----- #
 
-        except Exception as e:
-            print(e)
-            return json.loads(json.dumps({"error": "Something went wrong while retrieving dashboard"}, default=str)), 500
+# ----- Connection Pools ----- #
+@api.route("/db_pool")
+@api.doc(description="Connection pool usage and checkout wait times of this worker, per database")
+class DatabasePools(Resource):
+    def get(self):
+        try:
+            return {name: describe_pool(engine) for name, engine in database_engines().items()}, 200
+        except Exception:
+            logger.exception("Unable to retrieve connection pools")
+            return {"error": "Unable to retrieve connection pools"}, 500
 
-# ----- END DASHBOARD ----- #
-@app.before_request
 def before_request_func():
     session_id = request.cookies.get('SESSION_ID')
     url = request.url
     method = request.method
-    print(session_id)
-    print(url)
-    print(url == BASE_URL)
     if method != "OPTIONS" and "user_login" not in url \
         and "user_registration" not in url \
         and "user_logout" not in url \
         and "swagger" not in url\
+        and request.path != "/metrics" \
         and url != BASE_URL:
         if session_id:
-            user_session = Sessions.query.filter_by(session_id=session_id).first()
-            if user_session:
-                request.user = user_session.user_email
+            user_email = get_session_user(session_id)
+            if user_email:
+                request.user = user_email
             else:
-                return json.loads(json.dumps({"error": "Unauthorized request"}, default=str)), 401
+                return {"error": "Unauthorized request"}, 401
         else:
-            print("unauthorized")
-            return json.loads(json.dumps({"error": "Unauthorized request"}, default=str)), 403
+            return {"error": "Unauthorized request"}, 403
+
+
+# ==================== APP FACTORY ====================#
+def create_app(config=None):
+    """Builds the application. Nothing here connects to the database: engines
+    are created on first use, so under `gunicorn --preload` every worker opens
+    its own connections after the fork. `config` overrides the settings read
+    from the environment, e.g. SQLALCHEMY_DATABASE_URI for scripts and tests."""
+    app = Flask(__name__)
+    app.config.update(default_config())
+    app.config.update(config or {})
+
+    # JSON lines on stdout, written by a background thread. Registered first so
+    # every record of a request carries its id
+    init_logging(
+        app,
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        debug_sample_rate=float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 0)),
+    )
+
+    CORS(app, supports_credentials=True)
+    db.init_app(app)
+
+    # With DB_REPLICA_ENDPOINT set, GET requests read from the replica. After a
+    # write the client reads from the primary for DB_REPLICA_LAG_WINDOW seconds so
+    # it sees its own changes. /change_proj_details writes despite being a GET.
+    init_read_routing(
+        app,
+        lag_window=float(os.getenv("DB_REPLICA_LAG_WINDOW", 5)),
+        primary_paths=["/change_proj_details"],
+    )
+
+    # Per-request statement counts and DB time, reported in Server-Timing and logs
+    init_request_instrumentation(
+        app,
+        max_statements=int(os.getenv("SQL_WARN_STATEMENTS", 20)),
+        max_db_ms=float(os.getenv("SQL_WARN_DB_MS", 200)),
+    )
+
+    # Prometheus metrics at /metrics: latency and status per route, pool usage and
+    # cache hits. Multi-worker setups need PROMETHEUS_MULTIPROC_DIR, see gunicorn.conf.py
+    init_metrics(
+        app,
+        engines=database_engines,
+        caches={"session": session_cache, "dashboard": dashboard_cache},
+    )
+
+    api.init_app(app)
+    app.before_request(before_request_func)
+
+    # Work every worker would otherwise repeat on its first requests; done
+    # here it is shared by the preloaded workers
+    configure_mappers()
+    with app.test_request_context():
+        api.__schema__
+    return app
 
 
 if __name__ == "__main__":
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
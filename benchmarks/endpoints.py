@@ -0,0 +1,317 @@
+# Endpoint benchmarks: runs the endpoints of app.py through the Flask test
+# client against a local database seeded with benchmarks/fixtures.py, and
+# reports latency percentiles and SQL statements per call (read from the
+# Server-Timing header).
+#
+# Usage:
+#   python benchmarks/endpoints.py                          SQLite file in a temp dir
+#   python benchmarks/endpoints.py --url mysql+mysqlconnector://user:pw@localhost/bench
+#                                                           empty local MySQL schema
+#   python benchmarks/endpoints.py --tasks-per-column 3334 --projects 10
+#                                                           ~100k tasks
+#   python benchmarks/endpoints.py --json before.json       save results
+#   python benchmarks/endpoints.py --compare before.json    print the change against saved results
+#   python benchmarks/endpoints.py --only board dashboard   run some of the cases
+#   python benchmarks/endpoints.py --gevent                 app as served by gevent_app.py
+#
+# Env vars read by app.py at import (TASK_ORDERING, cache sizes, ...) apply as usual.
+import sys
+
+if "--gevent" in sys.argv:
+    # Before anything else is imported, as gevent_app.py does
+    from gevent import monkey
+
+    monkey.patch_all()
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import re
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import fixtures
+from fixtures import surer
+
+STATEMENTS_RE = re.compile(r'desc="(\d+) statements"')
+
+def percentile(samples, pct):
+    # Nearest rank
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+def summarize(durations, queries, errors):
+    return {
+        "calls": len(durations),
+        "errors": errors,
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 95) * 1000, 3),
+        "p99_ms": round(percentile(durations, 99) * 1000, 3),
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 3) if durations else 0.0,
+        "queries": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+def session_cookie(response):
+    match = re.search(r"SESSION_ID=([^;]+)", response.headers.get("Set-Cookie", ""))
+    return match.group(1) if match else None
+
+def iso_deadline(days):
+    return (datetime.utcnow() + timedelta(days=days)).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+class Bench:
+    """State shared by the cases: the logged in client, the benchmark user's
+    projects and their task ids, and tasks created along the way."""
+
+    def __init__(self, client, email, project_ids, task_ids, users, tasks_per_column, rng):
+        self.client = client
+        self.email = email
+        self.project_ids = project_ids
+        self.task_ids = task_ids
+        self.users = users
+        self.tasks_per_column = tasks_per_column
+        self.rng = rng
+        self.created = []
+
+    def project(self, i):
+        return self.project_ids[i % len(self.project_ids)]
+
+    def task(self):
+        project_id = self.rng.choice(self.project_ids)
+        return project_id, self.rng.choice(self.task_ids[project_id])
+
+    def me(self):
+        return [{"user_email": self.email, "fname": "First", "lname": "Last"}]
+
+    def create_task(self, i):
+        response = self.client.post("/create_task", json={
+            "task_id": 0,
+            "project_id": self.project(i),
+            "title": f"Benchmark task {i}",
+            "description": "Created by benchmarks/endpoints.py",
+            "position": 0,
+            "deadline": iso_deadline(7),
+            "completion_status": "not started",
+            "assignees": self.me(),
+        })
+        if response.status_code == 200:
+            self.created.append(response.get_json()["task_id"])
+        return response
+
+# Each case is (name, call, prepare). prepare runs outside the timed section.
+def cases(bench):
+    c = bench.client
+    etags = {}
+
+    def board_etag(i):
+        project_id = bench.project(i)
+        if project_id not in etags:
+            etags[project_id] = c.get(f"/get_task_by_projectid?project_id={project_id}").headers.get("ETag")
+
+    def clear_dashboard(i):
+        surer.dashboard_cache.clear()
+
+    def ensure_created(i):
+        if not bench.created:
+            bench.create_task(i)
+
+    def update_task(i):
+        project_id, task_id = bench.task()
+        return c.patch("/update_task", json={
+            "task_id": task_id,
+            "project_id": project_id,
+            "title": f"Edited {i}",
+            "description": "Edited by benchmarks/endpoints.py",
+            "position": 0,
+            "deadline": iso_deadline(14),
+            "completion_status": "started",
+            "assignees": bench.me(),
+        })
+
+    def move_task(i):
+        project_id, task_id = bench.task()
+        return c.patch("/update_task_position", json={
+            "project_id": project_id,
+            "task_id": task_id,
+            "new_position": bench.rng.randrange(bench.tasks_per_column),
+            "new_status": bench.rng.choice(fixtures.STATUSES),
+        })
+
+    # Other users on a separate client, so the benchmark user's session cookie
+    # is neither replaced nor rotated
+    login_client = c.application.test_client()
+    others = [fixtures.user_email(n) for n in range(bench.users) if fixtures.user_email(n) != bench.email]
+
+    def login(i):
+        return login_client.post("/user_login", json={"email": others[i % len(others)], "password": fixtures.PASSWORD})
+
+    return [
+        ("login", login, None),
+        ("get_user_teams", lambda i: c.get(f"/get_user_teams?email={bench.email}"), None),
+        ("get_project", lambda i: c.get(f"/get_project?email={bench.email}"), None),
+        ("get_all_project_ids", lambda i: c.get("/get_all_project_ids"), None),
+        ("project", lambda i: c.get(f"/project?project_id={bench.project(i)}"), None),
+        ("board", lambda i: c.get(f"/get_task_by_projectid?project_id={bench.project(i)}"), None),
+        ("board_first_page", lambda i: c.get(f"/get_task_by_projectid?project_id={bench.project(i)}&limit=50"), None),
+        ("board_not_modified", lambda i: c.get(
+            f"/get_task_by_projectid?project_id={bench.project(i)}",
+            headers={"If-None-Match": etags[bench.project(i)]}
+        ), board_etag),
+        # Buffered, so the timing covers the whole stream and the response is closed
+        ("export", lambda i: c.get(f"/projects/{bench.project(i)}/export", buffered=True), None),
+        ("dashboard", lambda i: c.get("/dashboard"), None),
+        ("dashboard_uncached", lambda i: c.get("/dashboard"), clear_dashboard),
+        ("update_task", update_task, None),
+        ("update_task_position", move_task, None),
+        ("create_task", bench.create_task, None),
+        ("delete_task", lambda i: c.delete(f"/delete_task?task_id={bench.created.pop()}"), ensure_created),
+        ("change_proj_details", lambda i: c.get(
+            f"/change_proj_details?project_id={bench.project(i)}&description=Project&details=Edited {i}"
+        ), None),
+    ]
+
+def run_case(call, prepare, iterations, warmup):
+    durations, queries, errors = [], [], 0
+    for i in range(warmup + iterations):
+        if prepare is not None:
+            prepare(i)
+        started = time.perf_counter()
+        response = call(i)
+        elapsed = time.perf_counter() - started
+        if i < warmup:
+            continue
+        durations.append(elapsed)
+        if response.status_code >= 400:
+            errors += 1
+        match = STATEMENTS_RE.search(response.headers.get("Server-Timing", ""))
+        if match:
+            queries.append(int(match.group(1)))
+    return summarize(durations, queries, errors)
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+def print_results(results):
+    print(f"{'endpoint':<24}{'calls':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'queries':>9}")
+    for name, r in results.items():
+        queries = "-" if r["queries"] is None else f"{r['queries']:.1f}"
+        print(f"{name:<24}{r['calls']:>7}{r['errors']:>8}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['p99_ms']:>10.2f}{r['mean_ms']:>10.2f}{queries:>9}")
+
+def print_comparison(baseline, results):
+    meta = baseline["meta"]
+    print(f"\nchange against {meta.get('commit') or 'baseline'} "
+          f"({meta.get('tasks')} tasks, {meta.get('dialect')}, ordering={meta.get('ordering')})")
+    print(f"{'endpoint':<24}{'p50 ms':>26}{'p95 ms':>26}{'queries':>14}")
+    for name, r in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        cells = []
+        for key in ("p50_ms", "p95_ms"):
+            change = (r[key] - before[key]) / before[key] * 100 if before[key] else 0.0
+            cells.append(f"{before[key]:.2f} -> {r[key]:.2f} {change:+.0f}%")
+        queries = "-" if r["queries"] is None or before["queries"] is None \
+            else f"{before['queries']:.1f} -> {r['queries']:.1f}"
+        print(f"{name:<24}{cells[0]:>26}{cells[1]:>26}{queries:>14}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the endpoints of app.py")
+    parser.add_argument("--url", help="SQLAlchemy URL of an empty database, defaults to a temporary SQLite file")
+    parser.add_argument("--create-schema", action="store_true", help="Create the tables first (always done for SQLite)")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--members", type=int, default=5, help="Team members per project")
+    parser.add_argument("--tasks-per-column", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--only", nargs="+", help="Case names to run")
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--compare", help="Results file from an earlier run to compare against")
+    parser.add_argument("--gevent", action="store_true", help="Patch the standard library with gevent and build the app through gevent_app.py")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    url = args.url or "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="surer-bench-"), "bench.db")
+    if args.gevent:
+        import gevent_app
+
+        app = gevent_app.create_app({"SQLALCHEMY_DATABASE_URI": url})
+    else:
+        app = surer.create_app({"SQLALCHEMY_DATABASE_URI": url})
+    # Per-request records and the login records would drown the report. The
+    # app's log writer thread does not go through the redirected stdout, so
+    # the records are filtered at the loggers
+    logging.getLogger("surer").setLevel(logging.WARNING)
+    logging.getLogger("surer.requests").setLevel(logging.ERROR)
+
+    with app.app_context():
+        engine = surer.db.engine
+        if args.create_schema or engine.dialect.name == "sqlite":
+            fixtures.create_schema(engine)
+        started = time.perf_counter()
+        summary = fixtures.seed(engine, args.users, args.projects, args.members, args.tasks_per_column, random_seed=args.seed)
+        print(f"seeded {summary['tasks']} tasks, {summary['assignees']} assignees, {summary['projects']} projects, "
+              f"{summary['users']} users in {time.perf_counter() - started:.1f}s ({engine.dialect.name})")
+
+        # The user on the most teams, so reads span several projects
+        email = surer.db.session.query(surer.Team.user_email) \
+            .group_by(surer.Team.user_email) \
+            .order_by(surer.db.func.count().desc(), surer.Team.user_email.asc()).limit(1).scalar()
+        project_ids = [row.project_id for row in surer.Team.query.filter_by(user_email=email).all()]
+        task_ids = {
+            project_id: [task_id for task_id, in surer.db.session.query(surer.Task.task_id).filter_by(project_id=project_id)]
+            for project_id in project_ids
+        }
+
+    # Requests run outside the setup's app context, so each one gets its own
+    # context, session and `g` as it would in production
+    client = app.test_client()
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        response = client.post("/user_login", json={"email": email, "password": fixtures.PASSWORD})
+        client.set_cookie("localhost", "SESSION_ID", session_cookie(response))
+        bench = Bench(client, email, project_ids, task_ids, args.users, args.tasks_per_column, random.Random(args.seed))
+
+        results = {}
+        for name, call, prepare in cases(bench):
+            if args.only and name not in args.only:
+                continue
+            results[name] = run_case(call, prepare, args.iterations, args.warmup)
+
+    print(f"{args.iterations} calls per endpoint after {args.warmup} warmup calls, "
+          f"user on {len(project_ids)} projects, ordering={surer.TASK_ORDERING}{', gevent' if args.gevent else ''}\n")
+    print_results(results)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "dialect": url.split(":", 1)[0],
+            "ordering": surer.TASK_ORDERING,
+            "gevent": args.gevent,
+            "iterations": args.iterations,
+            **summary,
+        },
+        "results": results,
+    }
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(json.load(f), results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
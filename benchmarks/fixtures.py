@@ -0,0 +1,129 @@
+# Synthetic data for the benchmarks and the load generator: users with a known
+# password, projects with their teams, and tasks spread evenly over the three
+# board columns, each with a few assignees from the project's team.
+#
+# Rows are written with executemany INSERTs in chunks, so 100k tasks take a few
+# seconds. Seed into an empty schema: ids are assigned from 1.
+#
+# Usage: python benchmarks/fixtures.py --url sqlite:///bench.db --projects 100 --tasks-per-column 334
+import argparse
+import hashlib
+import os
+import random
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sqlalchemy import create_engine
+
+import app as surer
+
+PASSWORD = "benchmark-password"
+STATUSES = ["not started", "started", "completed"]
+CHUNK_SIZE = 5000
+
+def user_email(i):
+    return f"user{i}@bench.test"
+
+def project_members(project_id, users, members):
+    # Consecutive users, so every user is on about as many teams as any other
+    return [(project_id + k) % users for k in range(min(members, users))]
+
+def insert_chunked(connection, table, rows):
+    for start in range(0, len(rows), CHUNK_SIZE):
+        connection.execute(table.insert(), rows[start:start + CHUNK_SIZE])
+
+def seed(engine, users=50, projects=10, members=5, tasks_per_column=100, assignees_per_task=2, random_seed=0):
+    """Writes the synthetic data set and returns a summary of what was created."""
+    rng = random.Random(random_seed)
+    now = datetime.now().replace(microsecond=0)
+    sparse = surer.TASK_ORDERING == "sparse"
+
+    user_rows = []
+    for i in range(users):
+        salt = uuid.uuid4().hex
+        user_rows.append({
+            "email": user_email(i),
+            "hashed_password": hashlib.sha512((PASSWORD + salt).encode("utf-8")).hexdigest(),
+            "salt": salt,
+            "first_name": f"First{i}",
+            "last_name": f"Last{i}",
+        })
+
+    project_rows, team_rows, task_rows, assignee_rows = [], [], [], []
+    task_id = 0
+    for project_id in range(1, projects + 1):
+        team = project_members(project_id, users, members)
+        project_rows.append({
+            "project_id": project_id,
+            "creator": user_email(team[0]),
+            "description": f"Project {project_id}",
+            "details": "Synthetic benchmark project",
+            "created_at": now - timedelta(days=90),
+            "last_modified": now,
+            "version": 0,
+        })
+        team_rows.extend({"user_email": user_email(i), "project_id": project_id} for i in team)
+
+        for status in STATUSES:
+            for index in range(tasks_per_column):
+                task_id += 1
+                task_rows.append({
+                    "task_id": task_id,
+                    "project_id": project_id,
+                    "title": f"Task {task_id}",
+                    "description": "Synthetic benchmark task " * 4,
+                    "position": index * surer.TASK_POSITION_GAP if sparse else index,
+                    "created_datetime": now - timedelta(days=rng.randint(0, 90)),
+                    # Spread around today so the dashboard has overdue, due this week and later tasks
+                    "deadline": now + timedelta(days=rng.randint(-30, 60), hours=rng.randint(0, 23)),
+                    "completion_status": status,
+                })
+                for i in rng.sample(team, min(assignees_per_task, len(team))):
+                    assignee_rows.append({
+                        "task_id": task_id,
+                        "project_id": project_id,
+                        "user_email": user_email(i),
+                        "fname": f"First{i}",
+                        "lname": f"Last{i}",
+                    })
+
+    with engine.begin() as connection:
+        insert_chunked(connection, surer.User.__table__, user_rows)
+        insert_chunked(connection, surer.Project.__table__, project_rows)
+        insert_chunked(connection, surer.Team.__table__, team_rows)
+        insert_chunked(connection, surer.Task.__table__, task_rows)
+        insert_chunked(connection, surer.Assignee.__table__, assignee_rows)
+
+    return {
+        "users": users,
+        "projects": projects,
+        "members": min(members, users),
+        "tasks": len(task_rows),
+        "assignees": len(assignee_rows),
+    }
+
+def create_schema(engine):
+    surer.db.metadata.create_all(engine)
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a database with synthetic boards")
+    parser.add_argument("--url", required=True, help="SQLAlchemy database URL of an empty database")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--projects", type=int, default=10)
+    parser.add_argument("--members", type=int, default=5, help="Team members per project")
+    parser.add_argument("--tasks-per-column", type=int, default=100)
+    parser.add_argument("--assignees-per-task", type=int, default=2)
+    parser.add_argument("--create-schema", action="store_true", help="Create the tables first (SQLite)")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if args.create_schema:
+        create_schema(engine)
+    summary = seed(engine, args.users, args.projects, args.members, args.tasks_per_column, args.assignees_per_task)
+    print(", ".join(f"{value} {name}" for name, value in summary.items()))
+    print(f"All users log in with password {PASSWORD!r}")
+
+if __name__ == "__main__":
+    main()
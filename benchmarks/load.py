@@ -0,0 +1,331 @@
+# Mixed-workload load generator for a running instance. Simulated users log in
+# through /user_login, keep their SESSION_ID cookie, and issue a weighted mix of
+# board polls, card moves, card edits, dashboard views and re-logins at a
+# target overall rate. Afterwards the board invariants are checked: every
+# task is still on its board exactly once and positions in each column are
+# distinct (and 0..n-1 with dense ordering).
+#
+# Seed the instance's database first, e.g.
+#   python benchmarks/fixtures.py --url mysql+mysqlconnector://user:pw@localhost/bench --projects 20
+#   gunicorn -c gunicorn.conf.py -w 4 --preload "app:create_app()"
+#   python benchmarks/load.py --base-url http://localhost:8000 --users 40 --rate 200 --duration 60 \
+#       --mix board=50,move=20,edit=10,dashboard=15,login=5 \
+#       --db-url mysql+mysqlconnector://user:pw@localhost/bench
+#
+# Past a few hundred users, pass --gevent so the simulated users are greenlets
+# rather than threads and the generator itself does not become the bottleneck.
+import sys
+
+if "--gevent" in sys.argv:
+    from gevent import monkey
+
+    monkey.patch_all()
+
+import argparse
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import requests
+
+from endpoints import percentile
+from fixtures import PASSWORD, STATUSES, user_email
+
+COLUMNS = {"todo": "not started", "inprogress": "started", "completed": "completed"}
+DEFAULT_MIX = "board=50,move=20,edit=10,dashboard=15,login=5"
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, weight = part.split("=")
+        if name not in SimulatedUser.OPERATIONS:
+            raise SystemExit(f"Unknown operation {name!r}, expected one of {', '.join(SimulatedUser.OPERATIONS)}")
+        weights[name] = float(weight)
+    return weights
+
+def iso_deadline(deadline):
+    # Boards return deadlines as stored; the API adds 8 hours to what it is sent
+    stored = datetime.strptime(str(deadline)[:19], "%Y-%m-%d %H:%M:%S")
+    return (stored - timedelta(hours=8)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.error_samples = {}
+
+    def record(self, operation, elapsed, error=None):
+        with self.lock:
+            self.latencies[operation].append(elapsed)
+            if error is not None:
+                self.errors[operation] += 1
+                self.error_samples.setdefault(operation, error)
+
+class SimulatedUser:
+    OPERATIONS = ("board", "move", "edit", "dashboard", "login")
+
+    def __init__(self, base_url, email, rng, use_etags=True, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.email = email
+        self.rng = rng
+        self.use_etags = use_etags
+        self.timeout = timeout
+        self.http = requests.Session()
+        self.project_ids = []
+        self.boards = {}
+        self.etags = {}
+
+    def request(self, method, path, **kwargs):
+        return self.http.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+
+    def login(self):
+        response = self.request("POST", "/user_login", json={"email": self.email, "password": PASSWORD})
+        # The cookie is marked Secure, so requests would not send it back over http
+        match = re.search(r"SESSION_ID=([^;]+)", response.headers.get("Set-Cookie", ""))
+        if match:
+            self.http.headers["Cookie"] = f"SESSION_ID={match.group(1)}"
+        return response
+
+    def load_projects(self):
+        response = self.request("GET", "/get_user_teams", params={"email": self.email})
+        response.raise_for_status()
+        self.project_ids = [project["project_id"] for project in response.json()]
+
+    def board(self, project_id=None):
+        project_id = project_id or self.rng.choice(self.project_ids)
+        headers = {}
+        if self.use_etags and project_id in self.etags:
+            headers["If-None-Match"] = self.etags[project_id]
+        response = self.request("GET", "/get_task_by_projectid", params={"project_id": project_id}, headers=headers)
+        if response.status_code == 200:
+            self.boards[project_id] = response.json()["tasks"]
+            if "ETag" in response.headers:
+                self.etags[project_id] = response.headers["ETag"]
+        return response
+
+    def known_task(self):
+        if not self.boards:
+            self.board()
+        project_id = self.rng.choice(list(self.boards))
+        tasks = [task for column in self.boards[project_id].values() for task in column]
+        return project_id, self.rng.choice(tasks) if tasks else None
+
+    def move(self):
+        project_id, task = self.known_task()
+        if task is None:
+            return self.board(project_id)
+        column = self.rng.choice(list(COLUMNS))
+        column_size = len(self.boards[project_id][column])
+        return self.request("PATCH", "/update_task_position", json={
+            "project_id": project_id,
+            "task_id": task["task_id"],
+            "new_position": self.rng.randint(0, column_size),
+            "new_status": COLUMNS[column],
+        })
+
+    def edit(self):
+        project_id, task = self.known_task()
+        if task is None:
+            return self.board(project_id)
+        return self.request("PATCH", "/update_task", json={
+            "task_id": task["task_id"],
+            "project_id": project_id,
+            "title": task["title"],
+            "description": f"Edited by {self.email} at {time.time():.0f}",
+            "position": task["position"],
+            "deadline": iso_deadline(task["deadline"]),
+            "completion_status": task["completion_status"],
+            "assignees": task["assignees"],
+        })
+
+    def dashboard(self):
+        return self.request("GET", "/dashboard")
+
+    def run(self, operation):
+        return getattr(self, operation)()
+
+def run_user(user, weights, interval, deadline, recorder):
+    operations, operation_weights = list(weights), list(weights.values())
+    next_at = time.perf_counter()
+    while True:
+        if interval:
+            # Exponential gaps around the target rate; a user that falls
+            # behind sends straight away instead of catching up in a burst
+            next_at = max(next_at + user.rng.expovariate(1 / interval), time.perf_counter())
+            if next_at >= deadline:
+                return
+            time.sleep(max(0, next_at - time.perf_counter()))
+        elif time.perf_counter() >= deadline:
+            return
+
+        operation = user.rng.choices(operations, weights=operation_weights)[0]
+        started = time.perf_counter()
+        try:
+            response = user.run(operation)
+            error = None if response.status_code < 400 else f"{response.status_code} {response.text[:200]}"
+        except Exception as e:
+            error = f"{e.__class__.__name__}: {e}"
+        recorder.record(operation, time.perf_counter() - started, error)
+
+def listen(user, stop, recorder):
+    # Holds one board's event stream open until the run ends, like a browser
+    # tab with the board open
+    project_id = user.rng.choice(user.project_ids)
+    started = time.perf_counter()
+    try:
+        response = requests.get(
+            f"{user.base_url}/projects/{project_id}/events",
+            headers={"Cookie": user.http.headers.get("Cookie", "")},
+            stream=True,
+            timeout=user.timeout,
+        )
+        error = None if response.status_code < 400 else f"{response.status_code} {response.text[:200]}"
+    except Exception as e:
+        error = f"{e.__class__.__name__}: {e}"
+    recorder.record("listen", time.perf_counter() - started, error)
+    if error is None:
+        try:
+            # Heartbeats arrive every EVENTS_HEARTBEAT seconds at the latest
+            for _ in response.iter_content(chunk_size=None):
+                if stop.is_set():
+                    break
+        except Exception:
+            pass
+        response.close()
+
+def read_boards(users):
+    # Every board read once by one of its members, bypassing the ETag
+    readers = {}
+    for user in users:
+        for project_id in user.project_ids:
+            readers.setdefault(project_id, user)
+    boards = {}
+    for project_id, user in sorted(readers.items()):
+        user.etags.pop(project_id, None)
+        response = user.board(project_id)
+        if response.status_code == 401:
+            # A login whose response was lost (e.g. timed out) rotated the session
+            user.login()
+            response = user.board(project_id)
+        response.raise_for_status()
+        boards[project_id] = response.json()["tasks"]
+    return boards
+
+def check_boards(before, after):
+    problems = []
+    for project_id, board in after.items():
+        task_ids = [task["task_id"] for column in board.values() for task in column]
+        if len(task_ids) != len(set(task_ids)):
+            problems.append(f"project {project_id}: a task appears more than once")
+        if sorted(task_ids) != sorted(task["task_id"] for column in before[project_id].values() for task in column):
+            problems.append(f"project {project_id}: tasks were lost or added")
+        for column, tasks in board.items():
+            if [task["position"] for task in tasks] != list(range(len(tasks))):
+                problems.append(f"project {project_id} {column}: positions are not 0..{len(tasks) - 1}")
+    return problems
+
+def check_database(db_url, project_ids):
+    # Stored positions: distinct within a column, and contiguous from 0 when dense
+    from sqlalchemy import create_engine, text
+
+    problems = []
+    engine = create_engine(db_url)
+    with engine.connect() as connection:
+        rows = connection.execute(text(
+            "SELECT project_id, completion_status, COUNT(*), COUNT(DISTINCT position), MIN(position), MAX(position) "
+            "FROM task GROUP BY project_id, completion_status"
+        )).fetchall()
+    dense = os.getenv("TASK_ORDERING", "dense") != "sparse"
+    for project_id, status, no_tasks, no_positions, first, last in rows:
+        if project_id not in project_ids:
+            continue
+        if status not in STATUSES:
+            problems.append(f"project {project_id}: unknown status {status!r}")
+        if no_positions != no_tasks:
+            problems.append(f"project {project_id} {status}: {no_tasks - no_positions} duplicate positions")
+        elif dense and (first != 0 or last != no_tasks - 1):
+            problems.append(f"project {project_id} {status}: positions run {first}..{last} for {no_tasks} tasks")
+    return problems
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive a running instance with a mixed workload")
+    parser.add_argument("--base-url", default="http://localhost:5000")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent simulated users, logged in as user0.. from fixtures.py")
+    parser.add_argument("--rate", type=float, default=50, help="Target operations per second over all users, 0 for as fast as possible")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Operation weights, default {DEFAULT_MIX}")
+    parser.add_argument("--no-etags", action="store_true", help="Poll boards without If-None-Match")
+    parser.add_argument("--listeners", type=int, default=0, help="Users that also keep a board's event stream open")
+    parser.add_argument("--db-url", help="Database of the instance, to check the stored positions directly")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--gevent", action="store_true", help="Run the simulated users as greenlets")
+    args = parser.parse_args()
+
+    weights = parse_mix(args.mix)
+    rng = random.Random(args.seed)
+    users = [
+        SimulatedUser(args.base_url, user_email(i), random.Random(rng.random()), use_etags=not args.no_etags)
+        for i in range(args.users)
+    ]
+    for user in users:
+        response = user.login()
+        if response.status_code != 200:
+            raise SystemExit(f"Login failed for {user.email}: {response.status_code} {response.text[:200]}")
+        user.load_projects()
+    users = [user for user in users if user.project_ids]
+    if not users:
+        raise SystemExit("None of the simulated users is on a team, seed the database with benchmarks/fixtures.py")
+
+    before = read_boards(users)
+    recorder = Recorder()
+    interval = len(users) / args.rate if args.rate else 0
+    stop_listening = threading.Event()
+    for user in users[:args.listeners]:
+        threading.Thread(target=listen, args=(user, stop_listening, recorder), daemon=True).start()
+    started = time.perf_counter()
+    threads = [
+        threading.Thread(target=run_user, args=(user, weights, interval, started + args.duration, recorder), daemon=True)
+        for user in users
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop_listening.set()
+
+    # Stream connections are reported on their own line, outside the totals
+    operations = {operation: latencies for operation, latencies in recorder.latencies.items() if operation != "listen"}
+    total = sum(len(latencies) for latencies in operations.values())
+    errors = sum(count for operation, count in recorder.errors.items() if operation != "listen")
+    target = f"{args.rate:.1f}/s" if args.rate else "unbounded"
+    print(f"{len(users)} users, {elapsed:.1f}s, {total} operations, {total / elapsed:.1f} ops/s (target {target}), "
+          f"{errors} errors ({errors / total * 100 if total else 0:.2f}%)\n")
+    print(f"{'operation':<12}{'calls':>8}{'ops/s':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for operation in list(weights) + (["listen"] if args.listeners else []):
+        latencies = recorder.latencies.get(operation, [])
+        print(f"{operation:<12}{len(latencies):>8}{len(latencies) / elapsed:>9.1f}{recorder.errors[operation]:>8}"
+              f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}"
+              f"{percentile(latencies, 99) * 1000:>10.1f}")
+    everything = [latency for latencies in operations.values() for latency in latencies]
+    print(f"{'all':<12}{total:>8}{total / elapsed:>9.1f}{errors:>8}{percentile(everything, 50) * 1000:>10.1f}"
+          f"{percentile(everything, 95) * 1000:>10.1f}{percentile(everything, 99) * 1000:>10.1f}")
+    for operation, sample in recorder.error_samples.items():
+        print(f"first {operation} error: {sample}")
+
+    problems = check_boards(before, read_boards(users))
+    if args.db_url:
+        problems += check_database(args.db_url, set(before))
+    print(f"\ninvariants: {'ok' if not problems else 'VIOLATED'} ({len(before)} boards checked)")
+    for problem in problems:
+        print(f"  {problem}")
+    sys.exit(1 if problems or errors else 0)
+
+if __name__ == "__main__":
+    main()
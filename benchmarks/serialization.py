@@ -0,0 +1,64 @@
+# Before/after microbenchmark for response encoding on a large board payload.
+#   before: json.loads(json.dumps(payload, default=str)) in the handler, then
+#           json.dumps again in flask-restx's output_json
+#   after:  utils.dumps(payload) once in the registered representation
+#
+# Usage: python benchmarks/serialization.py [--tasks 2000] [--repeat 20]
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import utils
+
+def board_payload(no_tasks):
+    now = datetime(2024, 1, 1, 9, 30)
+    columns = {"todo": [], "inprogress": [], "completed": []}
+    statuses = list(zip(columns, ["not started", "started", "completed"]))
+    for task_id in range(no_tasks):
+        column, status = statuses[task_id % 3]
+        columns[column].append({
+            "task_id": task_id,
+            "project_id": 1,
+            "title": f"Task {task_id}",
+            "description": "Lorem ipsum dolor sit amet, consectetur adipiscing elit " * 3,
+            "position": len(columns[column]),
+            "created_datetime": now,
+            "deadline": now + timedelta(days=task_id % 30),
+            "completion_status": status,
+            "assignees": [
+                {"user_email": f"user{i}@example.com", "fname": f"First{i}", "lname": f"Last{i}"}
+                for i in range(task_id % 4)
+            ],
+        })
+    return {"tasks": columns}
+
+def before(payload):
+    return json.dumps(json.loads(json.dumps(payload, default=str))) + "\n"
+
+def after(payload):
+    return utils.dumps(payload) + b"\n"
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    payload = board_payload(args.tasks)
+    assert json.loads(before(payload)) == json.loads(after(payload))
+
+    backend = "orjson" if utils.orjson is not None else "json"
+    print(f"board with {args.tasks} tasks, best of {args.repeat} runs, backend={backend}")
+    results = {}
+    for name, encode in (("before", before), ("after", after)):
+        best = min(timeit.repeat(lambda: encode(payload), number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"  {name:<7}{best * 1000:8.2f} ms")
+    print(f"  speedup {results['before'] / results['after']:7.1f}x")
+
+if __name__ == "__main__":
+    main()
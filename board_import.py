@@ -0,0 +1,174 @@
+# Reads boards to import from NDJSON or CSV, one record at a time.
+#
+# NDJSON has one object per line with a "type" (the format written by
+# /projects/<id>/export is accepted as is):
+#   {"type": "project", "project_id": "src-1", "description": "...", "details": "..."}
+#       creates a new project owned by the importing user. Later records
+#       refer to it by the same project_id.
+#   {"type": "member", "user_email": "..."}
+#       adds an existing user to the team of the last project created above.
+#   {"type": "task", "project_id": ..., "title": "...", "description": "...",
+#    "deadline": "...", "completion_status": "...", "assignees": [...]}
+#       appends a task to its column, either in a project created by the import
+#       or in an existing project the importing user is on the team of.
+#       Assignees are emails or {"user_email", "fname", "lname"} objects.
+#
+# CSV has a header row and one task per row with the columns project_id,
+# title, description, deadline, completion_status and assignees (emails
+# separated by ";").
+#
+# Deadlines are either stored values ("2024-01-31 17:00:00", as exported) or
+# API values ("2024-01-31T09:00:00.000Z", shifted by 8 hours like
+# /create_task does).
+#
+# Usage: python board_import.py FILE --user EMAIL [--format ndjson|csv] [--batch-size N]
+# imports straight into the database app.py connects to, unless --url is given.
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, Tuple
+import argparse
+import csv
+import json
+import sys
+import time
+
+STATUSES = ("not started", "started", "completed")
+RECORD_TYPES = ("project", "member", "task")
+CSV_COLUMNS = ("project_id", "title", "description", "deadline", "completion_status", "assignees")
+
+
+class BoardImportError(Exception):
+    def __init__(self, line: int, message: str):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.message = message
+
+
+def parse_deadline(value: Any) -> Any:
+    if value is None or value == "":
+        return None
+    value = str(value)
+    try:
+        if value.endswith("Z"):
+            return datetime.strptime(value, "%Y-%m-%dT%H:%M:%S.%fZ") + timedelta(hours=8)
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"invalid deadline {value!r}")
+
+
+def parse_assignees(value: Any) -> list:
+    if value is None or value == "":
+        return []
+    if isinstance(value, str):
+        value = [email.strip() for email in value.split(";") if email.strip()]
+    assignees = []
+    for assignee in value:
+        if isinstance(assignee, str):
+            assignee = {"user_email": assignee}
+        if not isinstance(assignee, dict) or not assignee.get("user_email"):
+            raise ValueError("assignees must be emails or objects with a user_email")
+        assignees.append(assignee)
+    return assignees
+
+
+def validate(record: Dict[str, Any]) -> Dict[str, Any]:
+    record_type = record.get("type")
+    if record_type not in RECORD_TYPES:
+        raise ValueError(f"unknown record type {record_type!r}")
+    if record_type == "project":
+        if record.get("project_id") is None or not record.get("description"):
+            raise ValueError("projects need a project_id and a description")
+        return record
+    if record_type == "member":
+        if not record.get("user_email"):
+            raise ValueError("members need a user_email")
+        return record
+
+    if record.get("project_id") in (None, ""):
+        raise ValueError("tasks need a project_id")
+    if not record.get("title"):
+        raise ValueError("tasks need a title")
+    if record.get("completion_status") not in STATUSES:
+        raise ValueError(f"completion_status must be one of {', '.join(STATUSES)}")
+    return {
+        "type": "task",
+        "project_id": record["project_id"],
+        "title": record["title"],
+        "description": record.get("description") or "<No description entered>",
+        "deadline": parse_deadline(record.get("deadline")),
+        "completion_status": record["completion_status"],
+        "assignees": parse_assignees(record.get("assignees")),
+    }
+
+
+def read_ndjson(lines: Iterable[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    for line_no, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("expected an object")
+            yield line_no, validate(record)
+        except ValueError as e:
+            raise BoardImportError(line_no, str(e))
+
+
+def read_csv(lines: Iterable[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    reader = csv.DictReader(lines)
+    missing = [column for column in CSV_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise BoardImportError(1, f"missing columns {', '.join(missing)}")
+    for row in reader:
+        try:
+            yield reader.line_num, validate({"type": "task", **row})
+        except ValueError as e:
+            raise BoardImportError(reader.line_num, str(e))
+
+
+def read_records(lines: Iterable[str], fmt: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Yields (line number, validated record) pairs from an iterable of text
+    lines, raising BoardImportError at the first invalid record."""
+    if fmt == "csv":
+        return read_csv(lines)
+    if fmt == "ndjson":
+        return read_ndjson(lines)
+    raise ValueError(f"unknown format {fmt!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import boards from NDJSON or CSV")
+    parser.add_argument("file", help="File to import, - for stdin")
+    parser.add_argument("--user", required=True, help="Email of the importing user, who owns the new projects")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="Defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, help="Tasks per INSERT batch, defaults to IMPORT_BATCH_SIZE")
+    parser.add_argument("--url", help="SQLAlchemy database URL, defaults to the one app.py uses")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.file.endswith(".csv") else "ndjson")
+    # Run as a script this module is __main__; the app's copy of it is the one
+    # whose BoardImportError the importer raises
+    import app as surer
+    application = surer.create_app({"SQLALCHEMY_DATABASE_URI": args.url} if args.url else None)
+
+    started = time.perf_counter()
+
+    def progress(counts):
+        elapsed = time.perf_counter() - started
+        print(f"\r{counts['tasks']} tasks, {counts['assignees']} assignees, {counts['projects']} projects "
+              f"({counts['tasks'] / elapsed:.0f} tasks/s)", end="", file=sys.stderr, flush=True)
+
+    source = sys.stdin if args.file == "-" else open(args.file, newline="", encoding="utf-8")
+    try:
+        with application.app_context():
+            counts = surer.import_boards(surer.read_records(source, fmt), args.user, args.batch_size, progress)
+    except surer.BoardImportError as e:
+        print(f"\nImport failed, nothing was imported: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        source.close()
+    progress(counts)
+    print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
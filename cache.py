@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+import os
+import time
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60, timer: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable, default: Any = None, valid: Optional[Callable[[Any], bool]] = None) -> Any:
+        now = self.timer()
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at > now and (valid is None or valid(value)):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = self.timer() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class FileGeneration:
+    """Generation counter shared by every process on the host through the
+    modification time of a file. Bumping it lets one gunicorn worker tell the
+    others that their caches are stale. `changed` stats the file at most once
+    every `interval` seconds, so a bump reaches other workers that much later."""
+
+    def __init__(self, path: Optional[str], interval: float = 1, timer: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.interval = interval
+        self.timer = timer
+        self._seen = self._read()
+        self._checked_at = timer()
+
+    def _read(self) -> Optional[int]:
+        if not self.path:
+            return None
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def bump(self) -> None:
+        if not self.path:
+            return
+        with open(self.path, "a"):
+            pass
+        # Set the mtime ourselves so this worker knows its own bump, and still
+        # notices any later one from another worker
+        mtime = time.time_ns()
+        if mtime == self._seen:
+            mtime += 1
+        os.utime(self.path, ns=(mtime, mtime))
+        self._seen = mtime
+
+    def changed(self) -> bool:
+        if not self.path:
+            return False
+        now = self.timer()
+        if now - self._checked_at < self.interval:
+            return False
+        self._checked_at = now
+        current = self._read()
+        if current != self._seen:
+            self._seen = current
+            return True
+        return False
@@ -0,0 +1,158 @@
+from collections import deque
+from threading import Lock
+from typing import Any, Dict, Optional
+import os
+import time
+
+from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+
+def _percentile(ordered: list, pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+class PoolStats:
+    """Checkout counts and wait times of one pool in this worker. Waits cover
+    queueing for a free connection, opening a new one and the pre-ping."""
+
+    def __init__(self, recent: int = 1000):
+        self.lock = Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.recent_waits = deque(maxlen=recent)
+
+    def record_wait(self, wait: float, timed_out: bool = False) -> None:
+        with self.lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self.recent_waits.append(wait)
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            waits = sorted(self.recent_waits)
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "wait_ms": {
+                    "avg": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                    "max": round(self.max_wait * 1000, 3),
+                    # Over the last len(recent_waits) checkouts
+                    "p50": round(_percentile(waits, 50) * 1000, 3),
+                    "p95": round(_percentile(waits, 95) * 1000, 3),
+                    "p99": round(_percentile(waits, 99) * 1000, 3),
+                },
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that keeps PoolStats, and that never hands a connection
+    opened by another process (e.g. before a fork) to this one."""
+
+    def __init__(self, creator, stats: Optional[PoolStats] = None, **kw):
+        super().__init__(creator, **kw)
+        self.stats = stats if stats is not None else PoolStats()
+        # recreate() passes the listeners on to the new pool along with its stats
+        if "_dispatch" not in kw:
+            event.listen(self, "connect", self._on_connect)
+            event.listen(self, "checkout", self._on_checkout)
+            event.listen(self, "invalidate", self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        connection_record.info["pid"] = os.getpid()
+        self.stats.count("connects")
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        if connection_record.info.get("pid") != os.getpid():
+            # Dropped without closing; the socket belongs to the parent process
+            connection_record.dbapi_connection = connection_proxy.dbapi_connection = None
+            raise exc.DisconnectionError("Connection was opened by another process")
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        self.stats.count("invalidations")
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.stats.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        self.stats.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+
+def pool_options(size: int, max_overflow: int, recycle: int, timeout: float, pre_ping: bool) -> Dict[str, Any]:
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": size,
+        "max_overflow": max_overflow,
+        "pool_recycle": recycle,
+        "pool_timeout": timeout,
+        "pool_pre_ping": pre_ping,
+    }
+
+
+class PooledSQLAlchemy(SQLAlchemy):
+    """Applies app.config["DB_POOL_OPTIONS"] and the driver arguments in
+    app.config["DB_CONNECT_ARGS"] to the primary and every bind. SQLite keeps
+    the pools Flask-SQLAlchemy picks for it."""
+
+    def apply_driver_hacks(self, app, sa_url, options):
+        sa_url, options = super().apply_driver_hacks(app, sa_url, options)
+        if not sa_url.drivername.startswith("sqlite"):
+            options.update(app.config.get("DB_POOL_OPTIONS") or {})
+            options.setdefault("connect_args", {}).update(app.config.get("DB_CONNECT_ARGS") or {})
+        return sa_url, options
+
+
+def dispose_after_fork(engine: Engine) -> None:
+    # close=False leaves the parent's sockets alone; closing them here would
+    # end the parent's sessions on the server
+    engine.dispose(close=False)
+    if isinstance(engine.pool, TimedQueuePool):
+        engine.pool.stats = PoolStats()
+
+
+def describe_pool(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {"pool": pool.status()}
+    description = {
+        "pool": {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "recycle": pool._recycle,
+            "pre_ping": pool._pre_ping,
+        },
+    }
+    if isinstance(pool, TimedQueuePool):
+        description.update(pool.stats.snapshot())
+    return description
@@ -0,0 +1,88 @@
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+import time
+
+from flask import Flask, Response, current_app, g, has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import orm
+
+from db_pool import PooledSQLAlchemy
+
+REPLICA_BIND = "replica"
+STICKY_COOKIE = "DB_PRIMARY_UNTIL"
+READ_METHODS = ("GET", "HEAD")
+
+
+def reading_from_replica() -> bool:
+    return has_request_context() and bool(g.get("read_from_replica"))
+
+
+class RoutingSession(SignallingSession):
+    """Sends every statement to the replica while the current request reads
+    from it, and to the primary (or the model's own bind) otherwise."""
+
+    def __init__(self, db: SQLAlchemy, **options):
+        self.db = db
+        super().__init__(db, **options)
+
+    def get_bind(self, mapper=None, clause=None):
+        if reading_from_replica():
+            return self.db.get_engine(self.app, bind=REPLICA_BIND)
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(PooledSQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+def replica_configured(app: Flask) -> bool:
+    return REPLICA_BIND in (app.config.get("SQLALCHEMY_BINDS") or {})
+
+
+@contextmanager
+def on_primary() -> Iterator[None]:
+    """Reads from the primary inside the block, e.g. to retry a lookup that
+    missed on a replica that has not caught up yet."""
+    previous = g.get("read_from_replica", False)
+    g.read_from_replica = False
+    try:
+        yield
+    finally:
+        g.read_from_replica = previous
+
+
+def init_read_routing(app: Flask, lag_window: float, primary_paths: Iterable[str] = ()) -> None:
+    """Routes GET and HEAD requests to the "replica" bind when
+    SQLALCHEMY_BINDS has one. A request that may have written (any other
+    method, or a path in primary_paths) sets a cookie that keeps the client's
+    reads on the primary for lag_window seconds, so users see their own
+    writes. Register before hooks that query the database."""
+    primary_paths = set(primary_paths)
+
+    def writes(method: str, path: str) -> bool:
+        return method not in READ_METHODS + ("OPTIONS",) or path in primary_paths
+
+    @app.before_request
+    def choose_database():
+        g.read_from_replica = False
+        if not replica_configured(current_app) or request.method not in READ_METHODS or request.path in primary_paths:
+            return
+        try:
+            primary_until = float(request.cookies.get(STICKY_COOKIE, 0))
+        except ValueError:
+            primary_until = 0
+        g.read_from_replica = primary_until <= time.time()
+
+    @app.after_request
+    def stick_to_primary(response: Response) -> Response:
+        if replica_configured(current_app) and writes(request.method, request.path) and response.status_code < 400:
+            response.set_cookie(
+                STICKY_COOKIE,
+                f"{time.time() + lag_window:.3f}",
+                max_age=int(lag_window) + 1,
+                httponly=True,
+                secure=True,
+                samesite="None",
+            )
+        return response
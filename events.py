@@ -0,0 +1,156 @@
+from threading import Lock, Thread
+from typing import Any, Dict, Optional, Set
+import json
+import logging
+import queue
+import time
+
+from utils import dumps
+
+logger = logging.getLogger("surer.events")
+
+RESYNC = {"type": "resync"}
+
+
+class Subscription:
+    """Bounded queue of events for one listener. When the listener falls too
+    far behind, pending events are dropped and a single resync event tells it
+    to reload the board instead."""
+
+    def __init__(self, channel: str, maxsize: int):
+        self.channel = channel
+        self.events: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize)
+
+    def put(self, event: Dict[str, Any]) -> None:
+        try:
+            self.events.put_nowait(event)
+        except queue.Full:
+            with self.events.mutex:
+                self.events.queue.clear()
+            self.events.put_nowait(RESYNC)
+
+    def get(self, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """In-process publish/subscribe hub. Events only reach subscribers in the
+    same process; use RedisEventHub to fan out across gunicorn workers."""
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._lock = Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        subscription = Subscription(channel, self.queue_size)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        self.deliver(channel, event)
+
+    def deliver(self, channel: str, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            subscription.put(event)
+
+    def resync_all(self) -> None:
+        with self._lock:
+            subscriptions = [subscription for channel in self._subscriptions.values() for subscription in channel]
+        for subscription in subscriptions:
+            subscription.put(RESYNC)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+class RedisEventHub(EventHub):
+    """EventHub that publishes through Redis pub/sub so every worker
+    subscribed to the broker delivers the event to its own listeners. The
+    listener thread starts on first subscribe, i.e. after gunicorn forks. When
+    the connection to Redis fails it reconnects with exponential backoff, and
+    tells every listener to resync since it may have missed events."""
+
+    def __init__(self, url: str, prefix: str = "surer:events:", queue_size: int = 100,
+                 backoff: float = 0.5, max_backoff: float = 30, sleep=time.sleep):
+        super().__init__(queue_size)
+        import redis
+
+        self.prefix = prefix
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self._redis = redis.Redis.from_url(url)
+        self._listener: Optional[Thread] = None
+        self._listener_lock = Lock()
+
+    def subscribe(self, channel: str) -> Subscription:
+        self._start_listener()
+        return super().subscribe(channel)
+
+    def publish(self, channel: str, event: Dict[str, Any]) -> None:
+        self._redis.publish(self.prefix + channel, dumps(event))
+
+    def _start_listener(self) -> None:
+        with self._listener_lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = Thread(target=self._listen, daemon=True)
+                self._listener.start()
+
+    def _listen(self) -> None:
+        failures = 0
+        while True:
+            pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(self.prefix + "*")
+                if failures:
+                    logger.warning("Reconnected to Redis", extra={"failures": failures})
+                    self.resync_all()
+                for message in pubsub.listen():
+                    failures = 0
+                    self._deliver_message(message)
+                raise ConnectionError("Redis pub/sub stream ended")
+            except Exception:
+                failures += 1
+                delay = min(self.backoff * 2 ** (failures - 1), self.max_backoff)
+                logger.exception("Redis event listener failed", extra={"retry_in": delay})
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            self.sleep(delay)
+
+    def _deliver_message(self, message: Dict[str, Any]) -> None:
+        try:
+            channel = message["channel"].decode("utf-8")[len(self.prefix):]
+            event = json.loads(message["data"])
+        except (KeyError, AttributeError, ValueError):
+            logger.warning("Dropping malformed event message")
+            return
+        self.deliver(channel, event)
+
+
+def create_event_hub(redis_url: Optional[str] = None, queue_size: int = 100) -> EventHub:
+    if redis_url:
+        return RedisEventHub(redis_url, queue_size=queue_size)
+    return EventHub(queue_size)
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {dumps(event).decode('utf-8')}\n\n"
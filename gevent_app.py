@@ -0,0 +1,28 @@
+# Cooperative serving mode: the same application, with the standard library
+# patched by gevent so a worker serves many requests at once. A request waiting
+# on MySQL, an SSE stream or a slow client yields to the others instead of
+# holding the worker.
+#
+#   gunicorn -c gunicorn.conf.py -k gevent --worker-connections 1000 -w 4 --preload "gevent_app:create_app()"
+#   python gevent_app.py            serves on localhost:5000 without gunicorn
+#
+# Patching has to happen before anything else is imported, so the app is
+# loaded through this module rather than app.py.
+from gevent import monkey
+
+monkey.patch_all()
+
+import app  # noqa: E402
+
+
+def create_app(config=None):
+    # The C extension of mysql-connector blocks the whole process while it
+    # waits on the server; the pure Python protocol goes through the patched
+    # socket module and yields instead
+    return app.create_app({"DB_CONNECT_ARGS": {"use_pure": True}, **(config or {})})
+
+
+if __name__ == "__main__":
+    from gevent.pywsgi import WSGIServer
+
+    WSGIServer(("localhost", 5000), create_app()).serve_forever()
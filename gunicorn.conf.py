@@ -0,0 +1,28 @@
+# gunicorn -c gunicorn.conf.py --preload "app:create_app()"
+import os
+import shutil
+
+
+def on_starting(server):
+    # Samples from a previous run would otherwise be added to this one
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Drops the live gauges of a worker that exited; its counters are kept
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def post_fork(server, worker):
+    # Connections opened by the master while preloading must not be shared
+    # between workers; each worker starts with empty pools instead
+    if server.cfg.preload_app:
+        import app
+
+        app.dispose_engines_after_fork(server.app.wsgi())
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+import logging
+import time
+
+from flask import Flask, Response, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("surer.requests")
+
+
+class SqlStats:
+    """Statements run while serving one request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements: List[Tuple[str, float]] = []
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.duration += duration
+        self.statements.append((statement, duration))
+
+    def top(self, limit: int = 5) -> List[Dict[str, Any]]:
+        # Grouped by statement text so N+1 patterns show up as one entry with a high count
+        grouped: Dict[str, List[float]] = defaultdict(list)
+        for statement, duration in self.statements:
+            grouped[" ".join(statement.split())].append(duration)
+        ranked = sorted(grouped.items(), key=lambda item: sum(item[1]), reverse=True)
+        return [
+            {"statement": statement[:300], "count": len(durations), "ms": round(sum(durations) * 1000, 2)}
+            for statement, durations in ranked[:limit]
+        ]
+
+
+# The start time lives on the statement's execution context rather than the
+# connection, so a statement that raises cannot leave behind a start time that
+# the next one on the connection would be timed against
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and context is not None:
+        context._query_started = time.perf_counter()
+
+
+def _record_statement(statement, context) -> None:
+    started = getattr(context, "_query_started", None)
+    if has_request_context() and started is not None:
+        del context._query_started
+        stats = g.get("sql_stats")
+        if stats is not None:
+            stats.record(statement, time.perf_counter() - started)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    _record_statement(statement, context)
+
+
+def _handle_error(exception_context) -> None:
+    # Failed statements still took database time
+    _record_statement(exception_context.statement, exception_context.execution_context)
+
+
+def init_request_instrumentation(app: Flask, max_statements: int, max_db_ms: float) -> None:
+    """Counts statements and database time per request on every engine. The
+    totals go out as a Server-Timing header and a "request" log record, and requests
+    over either threshold are logged as warnings with their top statements.
+    Register before other before_request hooks so the session lookup counts."""
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+    @app.before_request
+    def start_request_timing():
+        g.sql_stats = SqlStats()
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def finish_request_timing(response: Response) -> Response:
+        stats = g.get("sql_stats")
+        if stats is None:
+            return response
+        total_ms = (time.perf_counter() - g.request_started) * 1000
+        db_ms = stats.duration * 1000
+        response.headers.add(
+            "Server-Timing",
+            f'db;dur={db_ms:.2f};desc="{stats.count} statements", app;dur={total_ms:.2f}'
+        )
+
+        fields = {
+            "method": request.method,
+            "route": request.url_rule.rule if request.url_rule else request.path,
+            "status": response.status_code,
+            "duration_ms": round(total_ms, 2),
+            "db_statements": stats.count,
+            "db_ms": round(db_ms, 2),
+            "user": getattr(request, "user", None),
+        }
+        if stats.count > max_statements or db_ms > max_db_ms:
+            fields["top_statements"] = stats.top()
+            logger.warning("request", extra=fields)
+        else:
+            logger.info("request", extra=fields)
+        return response
@@ -0,0 +1,184 @@
+from threading import Lock, Thread
+from typing import Any, Dict, Optional
+import atexit
+import logging
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+
+from flask import Flask, Response, g, has_request_context, request
+from flask.logging import default_handler
+
+from utils import dumps
+
+LOGGER_NAME = "surer"
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Attributes every LogRecord has; anything else on a record came in through
+# `extra=` (or the request filter) and is written out as a field
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "stack"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, the request
+    fields, any `extra=` fields and the stack trace of a logged exception."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update((key, value) for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES)
+        stack = getattr(record, "stack", None) or (record.exc_info and self.formatException(record.exc_info))
+        if stack:
+            entry["stack"] = stack
+        try:
+            return dumps(entry).decode("utf-8")
+        except TypeError:
+            return dumps({key: value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)
+                          for key, value in entry.items()}).decode("utf-8")
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds the request id, method, route and user to records logged while
+    serving a request. Records under `level` are dropped, except for debug
+    records of the requests init_logging sampled (or, outside requests, the
+    same fraction of debug records). Filters run in the thread that logs,
+    where the request context is still available."""
+
+    def __init__(self, level: int, debug_sample_rate: float):
+        super().__init__()
+        self.level = level
+        self.debug_sample_rate = debug_sample_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        in_request = has_request_context()
+        if record.levelno < self.level:
+            if record.levelno > logging.DEBUG:
+                return False
+            if not (g.get("log_debug", False) if in_request else random.random() < self.debug_sample_rate):
+                return False
+        if in_request:
+            fields = {
+                "request_id": g.get("request_id"),
+                "method": request.method,
+                "route": request.url_rule.rule if request.url_rule else request.path,
+                "user": getattr(request, "user", None),
+            }
+            for key, value in fields.items():
+                if not hasattr(record, key):
+                    setattr(record, key, value)
+        return True
+
+
+class BackgroundHandler(logging.Handler):
+    """Queues records for a daemon thread that writes them to `target`, so
+    the thread serving a request never waits on stdout. When the queue is full
+    records are dropped and counted rather than blocking. The writer starts
+    on the first record, i.e. after gunicorn has forked."""
+
+    def __init__(self, target: logging.Handler, maxsize: int = 10000):
+        super().__init__()
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[logging.LogRecord]]" = queue.Queue(maxsize)
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolved here, since arguments and the exception can change or go
+        # away before the writer gets to the record
+        if record.exc_info:
+            record.stack = (self.target.formatter or logging.Formatter()).formatException(record.exc_info)
+        record.msg, record.args = record.getMessage(), None
+        record.exc_info = record.exc_text = None
+        return record
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            self._start_writer()
+            self._queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def close(self) -> None:
+        # Writes out what is queued, e.g. at interpreter exit
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(None, timeout=1)
+                thread.join(timeout=2)
+            except queue.Full:
+                pass
+        super().close()
+
+    def _start_writer(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            if self._thread is not None:
+                # Forked: the parent's writer did not come along, and what it
+                # had queued is the parent's to write
+                self._queue = queue.Queue(self.maxsize)
+            self._thread = Thread(target=self._write, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def _write(self) -> None:
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            self.target.handle(record)
+
+
+def init_logging(app: Flask, level: str = "INFO", debug_sample_rate: float = 0.0) -> BackgroundHandler:
+    """Sends the "surer" loggers and app.logger through one BackgroundHandler
+    writing JSON lines to stdout. Every request gets an id, taken from the
+    X-Request-ID header when the proxy sets one and echoed in the response.
+    debug_sample_rate is the fraction of requests whose debug records are
+    kept on top of those at `level`. Register before the other hooks so that
+    their records carry the request id."""
+    levelno = logging.getLevelName(level.upper())
+    if not isinstance(levelno, int):
+        raise ValueError(f"Unknown log level {level!r}")
+    if levelno <= logging.DEBUG:
+        debug_sample_rate = 1.0
+
+    logger = logging.getLogger(LOGGER_NAME)
+    handler = next((h for h in logger.handlers if isinstance(h, BackgroundHandler)), None)
+    if handler is None:
+        target = logging.StreamHandler(sys.stdout)
+        target.setFormatter(JsonFormatter())
+        handler = BackgroundHandler(target)
+        logger.addHandler(handler)
+        logger.propagate = False
+        atexit.register(handler.close)
+    handler.filters = [RequestContextFilter(levelno, debug_sample_rate)]
+    logger.setLevel(logging.DEBUG if debug_sample_rate > 0 else levelno)
+
+    # Errors Flask logs itself, e.g. unhandled exceptions, go the same way
+    app.logger.removeHandler(default_handler)
+    if handler not in app.logger.handlers:
+        app.logger.addHandler(handler)
+
+    @app.before_request
+    def start_request_logging():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER, "")[:64] or uuid.uuid4().hex
+        g.log_debug = debug_sample_rate > 0 and random.random() < debug_sample_rate
+
+    @app.after_request
+    def add_request_id(response: Response) -> Response:
+        if "request_id" in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
+
+    return handler
@@ -0,0 +1,100 @@
+from threading import Lock
+from typing import Callable, Dict
+import os
+import time
+
+from flask import Flask, Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# With PROMETHEUS_MULTIPROC_DIR set, every gunicorn worker writes its samples
+# to that directory and /metrics aggregates all of them, whichever worker
+# answers the scrape. See gunicorn.conf.py for the directory lifecycle.
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ["method", "route"]
+)
+REQUEST_COUNT = Counter(
+    "http_requests_total", "Requests by route and status", ["method", "route", "status"]
+)
+POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections", "Connections currently checked out of the pool",
+    ["engine"], multiprocess_mode="livesum"
+)
+POOL_OVERFLOW = Gauge(
+    "db_pool_overflow_connections", "Connections open beyond the pool size",
+    ["engine"], multiprocess_mode="livesum"
+)
+POOL_SIZE = Gauge(
+    "db_pool_size", "Configured pool size", ["engine"], multiprocess_mode="livesum"
+)
+CACHE_HITS = Counter("cache_hits_total", "Cache hits", ["cache"])
+CACHE_MISSES = Counter("cache_misses_total", "Cache misses", ["cache"])
+
+_synced_cache_stats: Dict[str, Dict[str, int]] = {}
+_synced_cache_lock = Lock()
+
+
+def _route() -> str:
+    return request.url_rule.rule if request.url_rule else "unmatched"
+
+
+def _record_pools(engines: Dict[str, object]) -> None:
+    for name, engine in engines.items():
+        pool = engine.pool
+        # Only QueuePool tracks checkouts and overflow
+        if hasattr(pool, "checkedout"):
+            POOL_CHECKED_OUT.labels(name).set(pool.checkedout())
+            POOL_OVERFLOW.labels(name).set(max(pool.overflow(), 0))
+            POOL_SIZE.labels(name).set(pool.size())
+
+
+def _record_caches(caches: Dict[str, object]) -> None:
+    # The caches keep plain totals; only the increase since the last sync is
+    # added to the counters so they stay monotonic across workers
+    with _synced_cache_lock:
+        for name, cache in caches.items():
+            stats = cache.stats()
+            synced = _synced_cache_stats.setdefault(name, {"hits": 0, "misses": 0})
+            CACHE_HITS.labels(name).inc(max(stats["hits"] - synced["hits"], 0))
+            CACHE_MISSES.labels(name).inc(max(stats["misses"] - synced["misses"], 0))
+            synced["hits"], synced["misses"] = stats["hits"], stats["misses"]
+
+
+def metrics_response() -> Response:
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def init_metrics(app: Flask, engines: Callable[[], Dict[str, object]], caches: Dict[str, object]) -> None:
+    """Records request latency and status per route and refreshes the pool
+    and cache metrics after each request. `engines` is called lazily because
+    the engine only exists once the app has handled its first query."""
+
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response: Response) -> Response:
+        started = g.get("metrics_started")
+        if started is not None:
+            route = _route()
+            REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+            REQUEST_COUNT.labels(request.method, route, str(response.status_code)).inc()
+        _record_pools(engines())
+        _record_caches(caches)
+        return response
+
+    app.add_url_rule("/metrics", "metrics", metrics_response)
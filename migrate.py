@@ -0,0 +1,143 @@
+# Applies the versioned schema migrations in sql/migrations and checks that the
+# hot queries can be served from an index.
+#
+#   python migrate.py                 apply pending migrations
+#   python migrate.py status          list applied and pending migrations
+#   python migrate.py check           EXPLAIN the hot queries, exit 1 on a full scan
+#
+# The database is the one app.py connects to (DB_USERNAME, DB_PASSWORD,
+# DB_ENDPOINT), unless --url is given.
+import argparse
+import os
+import re
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sql", "migrations")
+
+# Mirrors of the statements the endpoints run most, with sample parameters
+HOT_QUERIES = [
+    ("session lookup (before_request_func, UserLogout)",
+     "SELECT user_email FROM sessions WHERE session_id = :session_id",
+     {"session_id": "x"}),
+    ("board tasks (load_board)",
+     "SELECT * FROM task WHERE project_id = :project_id ORDER BY position",
+     {"project_id": 1}),
+    ("column shift (shift_task_positions)",
+     "SELECT task_id FROM task WHERE project_id = :project_id AND completion_status = :status AND position >= :position",
+     {"project_id": 1, "status": "started", "position": 0}),
+    ("board assignees (load_board)",
+     "SELECT * FROM assignee WHERE project_id = :project_id ORDER BY task_id, user_email",
+     {"project_id": 1}),
+    ("dashboard aggregates (compute_dashboard)",
+     "SELECT task.project_id, task.completion_status, COUNT(*) FROM task "
+     "JOIN assignee ON assignee.task_id = task.task_id "
+     "WHERE assignee.user_email = :email GROUP BY task.project_id, task.completion_status",
+     {"email": "x"}),
+    ("project members (load_project_members)",
+     "SELECT * FROM team WHERE project_id IN (:project_id) ORDER BY project_id, user_email",
+     {"project_id": 1}),
+    ("user projects (GetUserTeams, compute_dashboard)",
+     "SELECT project.project_id, project.version FROM project "
+     "JOIN team ON team.project_id = project.project_id WHERE team.user_email = :email",
+     {"email": "x"}),
+]
+
+def database_url():
+    load_dotenv()
+    return f"mysql+mysqlconnector://{os.getenv('DB_USERNAME')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_ENDPOINT')}"
+
+def migration_files():
+    migrations = []
+    for name in sorted(os.listdir(MIGRATIONS_DIR)):
+        match = re.match(r"^(\d+)_.*\.sql$", name)
+        if match:
+            migrations.append((match.group(1), name))
+    return migrations
+
+def split_statements(sql):
+    sql = "\n".join(line for line in sql.splitlines() if not line.strip().startswith("--"))
+    return [statement.strip() for statement in sql.split(";") if statement.strip()]
+
+def applied_versions(connection):
+    connection.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(32) NOT NULL PRIMARY KEY, "
+        "name VARCHAR(256) NOT NULL, "
+        "applied_at DATETIME NOT NULL)"
+    ))
+    return {row[0] for row in connection.execute(text("SELECT version FROM schema_migrations"))}
+
+def migrate(engine):
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    for version, name in migration_files():
+        if version in applied:
+            continue
+        print(f"Applying {name}")
+        with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+            statements = split_statements(f.read())
+        # MySQL commits DDL implicitly, so a migration is recorded only once
+        # all of its statements have gone through
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement))
+            connection.execute(
+                text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:version, :name, :applied_at)"),
+                {"version": version, "name": name, "applied_at": datetime.now()}
+            )
+
+def status(engine):
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    for version, name in migration_files():
+        print(f"{'applied' if version in applied else 'pending'}  {name}")
+
+# A plan step is a full scan when no index can serve it. Tiny tables may be
+# scanned even when an index exists, so for MySQL only steps without any
+# candidate key count.
+def full_scans(connection, sql, params):
+    if connection.dialect.name == "sqlite":
+        plan = connection.execute(text("EXPLAIN QUERY PLAN " + sql), params).fetchall()
+        return [row[-1] for row in plan if re.match(r"^SCAN (?!CONSTANT ROW)", row[-1])]
+
+    plan = connection.execute(text("EXPLAIN " + sql), params).mappings().fetchall()
+    return [
+        f"{row['table']}: type={row['type']}"
+        for row in plan
+        if row["type"] in ("ALL", "index") and not row["possible_keys"]
+    ]
+
+def check(engine):
+    failed = False
+    with engine.connect() as connection:
+        for name, sql, params in HOT_QUERIES:
+            try:
+                scans = full_scans(connection, sql, params)
+            except Exception as e:
+                scans = [f"EXPLAIN failed, are all migrations applied? {e.__class__.__name__}: {e.args[0] if e.args else ''}"]
+            print(f"{'FULL SCAN' if scans else 'ok':<10}{name}")
+            for scan in scans:
+                print(f"          {scan}")
+            failed = failed or bool(scans)
+    return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description="Schema migrations for surer-trello-BE")
+    parser.add_argument("command", nargs="?", default="migrate", choices=["migrate", "status", "check"])
+    parser.add_argument("--url", help="SQLAlchemy database URL, defaults to the one app.py uses")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url or database_url())
+    if args.command == "migrate":
+        migrate(engine)
+    elif args.command == "status":
+        status(engine)
+    else:
+        sys.exit(check(engine))
+
+if __name__ == "__main__":
+    main()
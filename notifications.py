@@ -0,0 +1,128 @@
+from threading import Lock, Thread
+from typing import Any, Dict, Iterable, List, Optional
+import logging
+import queue
+import time
+
+logger = logging.getLogger("surer.notifications")
+
+
+class TransportError(Exception):
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class MailjetTransport:
+    """Sends a Mailjet v3.1 `Messages` payload over HTTP. Point `url` at a
+    local stub server to exercise the pipeline without the real provider."""
+
+    def __init__(self, url: str, api_key: Optional[str], api_secret: Optional[str], timeout: float = 10):
+        import requests
+
+        self.url = url
+        self.auth = (api_key, api_secret) if api_key else None
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, payload: Dict[str, Any]) -> None:
+        try:
+            response = self.session.post(self.url, json=payload, auth=self.auth, timeout=self.timeout)
+        except Exception as e:
+            raise TransportError(str(e))
+        if response.status_code >= 400:
+            # Client errors other than rate limiting will not succeed on retry
+            retryable = response.status_code == 429 or response.status_code >= 500
+            raise TransportError(f"{response.status_code} {response.text[:200]}", retryable=retryable)
+
+
+class NotificationQueue:
+    """Bounded queue drained by a pool of daemon worker threads. Each item is
+    one provider call; failed calls are retried with exponential backoff.
+    Workers start on the first enqueue, i.e. after gunicorn has forked."""
+
+    def __init__(self, transport: Any, workers: int = 2, maxsize: int = 1000,
+                 retries: int = 3, backoff: float = 1.0, sleep=time.sleep):
+        self.transport = transport
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.sleep = sleep
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize)
+        self._threads: List[Thread] = []
+        self._lock = Lock()
+
+    def enqueue(self, payload: Dict[str, Any]) -> bool:
+        if self.transport is None:
+            return False
+        self._start_workers()
+        try:
+            self._queue.put_nowait(payload)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            logger.warning("Notification queue full, dropping message")
+            return False
+
+    def join(self) -> None:
+        self._queue.join()
+
+    def _start_workers(self) -> None:
+        with self._lock:
+            self._threads = [thread for thread in self._threads if thread.is_alive()]
+            while len(self._threads) < self.workers:
+                thread = Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self) -> None:
+        while True:
+            payload = self._queue.get()
+            try:
+                self._deliver(payload)
+            finally:
+                self._queue.task_done()
+
+    def _deliver(self, payload: Dict[str, Any]) -> None:
+        for attempt in range(self.retries + 1):
+            try:
+                self.transport.send(payload)
+                self.sent += 1
+                return
+            except TransportError as e:
+                if not e.retryable or attempt == self.retries:
+                    break
+                self.sleep(self.backoff * 2 ** attempt)
+            except Exception:
+                logger.exception("Notification transport failed")
+                break
+        self.failed += 1
+        logger.error("Notification could not be delivered")
+
+
+def deadline_updated_payload(task_title: str, recipients: Iterable[str], sender: str, sender_name: str) -> Dict[str, Any]:
+    # One provider call per task: a separate message per assignee, sent together
+    return {
+        "Messages": [
+            {
+                "From": {
+                    "Email": sender,
+                    "Name": sender_name
+                },
+                "To": [
+                    {
+                        "Email": f"{recipient}",
+                        "Name": f"{recipient}"
+                    }
+                ],
+                "Subject": f"{task_title}: Task Deadline Updated",
+                "TextPart": "Thank you for using Taskucci project management board - where efficiency meets usability",
+                "HTMLPart": f"Dear {recipient},<br><br> Please check your Taskucci application to view updated task deadline for {task_title}. Thank you!",
+                "CustomID": "Task deadline updated"
+            }
+            for recipient in recipients
+        ]
+    }
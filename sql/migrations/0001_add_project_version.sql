@@ -0,0 +1,2 @@
+-- Project version used for board/project ETags and dashboard cache validation.
+ALTER TABLE `project` ADD COLUMN `version` INT NOT NULL DEFAULT 0;
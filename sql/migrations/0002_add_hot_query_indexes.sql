@@ -0,0 +1,16 @@
+-- Indexes for the queries run on every request or board load.
+
+-- Session lookup in before_request_func and UserLogout (by session_id alone)
+CREATE INDEX `idx_sessions_session_id` ON `sessions` (`session_id`);
+
+-- Board columns: filtered by project and status, ordered and shifted by position
+CREATE INDEX `idx_task_project_status_position` ON `task` (`project_id`, `completion_status`, `position`);
+
+-- Dashboard: a user's assigned tasks
+CREATE INDEX `idx_assignee_user_task` ON `assignee` (`user_email`, `task_id`);
+
+-- Board loader: all assignees of a project, grouped by task
+CREATE INDEX `idx_assignee_project_task` ON `assignee` (`project_id`, `task_id`, `user_email`);
+
+-- Project members
+CREATE INDEX `idx_team_project_user` ON `team` (`project_id`, `user_email`);
@@ -0,0 +1,83 @@
+# Each test gets the app on its own SQLite file, and seeds the rows it needs
+# through the models below. Requests carry a session row inserted directly,
+# so no test depends on the login flow.
+import os
+import sys
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import app as surer  # noqa: E402
+
+DEADLINE = datetime(2030, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = surer.create_app({"SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'test.db'}", "TESTING": True})
+    with app.app_context():
+        surer.db.create_all()
+    surer.session_cache.clear()
+    surer.dashboard_cache.clear()
+    yield app
+    with app.app_context():
+        surer.db.session.remove()
+        surer.db.engine.dispose()
+
+
+def add_users(app, emails):
+    with app.app_context():
+        for email in emails:
+            surer.db.session.add(surer.User(email, None, None, f"First {email}", f"Last {email}"))
+        surer.db.session.commit()
+
+
+def add_project(app, creator, members=()):
+    with app.app_context():
+        project_id = surer.db.session.execute(surer.Project.__table__.insert().values(
+            creator=creator, description="Project", details="", created_at=datetime(2024, 1, 1), last_modified=datetime(2024, 1, 1),
+        )).inserted_primary_key[0]
+        for email in {creator, *members}:
+            surer.db.session.add(surer.Team(email, project_id))
+        surer.db.session.commit()
+        return project_id
+
+
+def add_task(app, project_id, completion_status, position, assignees=(), title=None, deadline=DEADLINE):
+    with app.app_context():
+        task = surer.Task(project_id, title or f"{completion_status} {position}", "", position, datetime(2024, 1, 1), deadline, completion_status)
+        surer.db.session.add(task)
+        surer.db.session.flush()
+        for email in assignees:
+            surer.db.session.add(surer.Assignee(task.task_id, project_id, email, f"First {email}", f"Last {email}"))
+        surer.db.session.commit()
+        return task.task_id
+
+
+def signed_in_client(app, email):
+    with app.app_context():
+        surer.db.session.add(surer.Sessions(email, f"session-{email}"))
+        surer.db.session.commit()
+    client = app.test_client()
+    client.set_cookie("localhost", "SESSION_ID", f"session-{email}")
+    return client
+
+
+@contextmanager
+def count_statements(app):
+    """Collects the SQL statements run on the app's primary engine inside the block."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = surer.db.engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
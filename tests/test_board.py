@@ -0,0 +1,69 @@
+# Statement budget of a board fetch. The board comes from a fixed number of
+# queries however many tasks and assignees it holds; a loop that queries per
+# task or per assignee shows up here as a count that grows with the board.
+#
+# Run with: python -m pytest tests
+import pytest
+
+import app as surer
+from conftest import add_project, add_task, add_users, count_statements, signed_in_client
+
+# The team check, the project version for the ETag, the tasks and their
+# assignees, once the worker has cached the caller's session
+BOARD_STATEMENTS = 4
+MEMBERS = ["a@test", "b@test", "c@test"]
+
+
+@pytest.mark.parametrize("tasks_per_column", [1, 20])
+def test_board_fetch_issues_a_fixed_number_of_statements(app, tasks_per_column):
+    add_users(app, MEMBERS)
+    project_id = add_project(app, MEMBERS[0], MEMBERS)
+    for status in ("not started", "started", "completed"):
+        for position in range(tasks_per_column):
+            add_task(app, project_id, status, position, assignees=MEMBERS)
+    client = signed_in_client(app, MEMBERS[0])
+
+    # The first request also looks the session up
+    with count_statements(app) as first:
+        client.get(f"/get_task_by_projectid?project_id={project_id}")
+    with count_statements(app) as statements:
+        response = client.get(f"/get_task_by_projectid?project_id={project_id}")
+
+    assert len(first) == BOARD_STATEMENTS + 1
+    assert response.status_code == 200
+    board = response.get_json()["tasks"]
+    assert [len(board[column]) for column in ("todo", "inprogress", "completed")] == [tasks_per_column] * 3
+    assert all(len(task["assignees"]) == len(MEMBERS) for column in board.values() for task in column)
+    assert len(statements) == BOARD_STATEMENTS, statements
+
+
+def test_board_pages_keep_tasks_that_share_a_position(app):
+    add_users(app, MEMBERS[:1])
+    project_id = add_project(app, MEMBERS[0])
+    # CreateTask inserts at the position it is sent, so dense positions can repeat
+    task_ids = [add_task(app, project_id, "started", position) for position in (0, 1, 1, 1, 2)]
+    client = signed_in_client(app, MEMBERS[0])
+
+    seen = []
+    url = f"/get_task_by_projectid?project_id={project_id}&limit=2"
+    response = client.get(url)
+    while True:
+        assert response.status_code == 200
+        seen += [task["task_id"] for task in response.get_json()["tasks"]["inprogress"]]
+        cursor = response.get_json()["next_cursors"]["inprogress"]
+        if cursor is None:
+            break
+        response = client.get(f"{url}&cursor={cursor}")
+
+    assert seen == task_ids
+
+
+def test_board_rejects_a_cursor_with_a_wrong_field_type(app):
+    add_users(app, MEMBERS[:1])
+    project_id = add_project(app, MEMBERS[0])
+    client = signed_in_client(app, MEMBERS[0])
+    cursor = surer.encode_cursor({"status": "started", "position": 0, "task_id": 1, "index": "x"})
+
+    response = client.get(f"/get_task_by_projectid?project_id={project_id}&cursor={cursor}")
+
+    assert response.status_code == 400
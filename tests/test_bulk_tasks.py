@@ -0,0 +1,68 @@
+import app as surer
+from conftest import add_project, add_task, add_users, signed_in_client
+
+USER = "a@test"
+
+
+def bulk_client(app):
+    add_users(app, [USER])
+    project_id = add_project(app, USER)
+    return signed_in_client(app, USER), project_id
+
+
+def test_empty_bulk_requests_do_nothing(app):
+    client, _ = bulk_client(app)
+
+    created = client.post("/tasks/bulk", json={"tasks": []})
+    updated = client.patch("/tasks/bulk", json={"tasks": []})
+
+    assert (created.status_code, created.get_json()) == (200, {"task_ids": []})
+    assert (updated.status_code, updated.get_json()) == (200, {"task_ids": []})
+
+
+def test_bulk_create_rejects_a_task_without_deadline(app):
+    client, project_id = bulk_client(app)
+    tasks = [
+        {"project_id": project_id, "title": "dated", "completion_status": "started", "deadline": "2030-01-01T10:00:00.000Z"},
+        {"project_id": project_id, "title": "undated", "completion_status": "started"},
+    ]
+
+    response = client.post("/tasks/bulk", json={"tasks": tasks})
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert surer.Task.query.count() == 0
+
+
+def test_bulk_create_rejects_an_invalid_deadline(app):
+    client, project_id = bulk_client(app)
+    tasks = [{"project_id": project_id, "title": "t", "completion_status": "started", "deadline": "tomorrow"}]
+
+    assert client.post("/tasks/bulk", json={"tasks": tasks}).status_code == 400
+
+
+def test_bulk_update_cannot_clear_a_deadline(app):
+    client, project_id = bulk_client(app)
+    task_id = add_task(app, project_id, "started", 0)
+
+    response = client.patch("/tasks/bulk", json={"tasks": [{"task_id": task_id, "deadline": None}]})
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert surer.Task.query.get(task_id).deadline is not None
+
+
+def test_bulk_create_with_deadlines(app):
+    client, project_id = bulk_client(app)
+    tasks = [
+        {"project_id": project_id, "title": f"t{i}", "completion_status": "started", "deadline": "2030-01-01T10:00:00.000Z"}
+        for i in range(3)
+    ]
+
+    response = client.post("/tasks/bulk", json={"tasks": tasks})
+
+    assert response.status_code == 200
+    with app.app_context():
+        created = [surer.Task.query.get(task_id) for task_id in response.get_json()["task_ids"]]
+        assert [task.title for task in created] == ["t0", "t1", "t2"]
+        assert [task.position for task in created] == [0, 1, 2]
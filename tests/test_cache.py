@@ -0,0 +1,36 @@
+from cache import FileGeneration
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bumping_worker_keeps_its_cache_but_sees_later_bumps(tmp_path):
+    path = str(tmp_path / "generation")
+    clock = Clock()
+    bumper = FileGeneration(path, interval=0, timer=clock)
+    other = FileGeneration(path, interval=0, timer=clock)
+
+    bumper.bump()
+    assert not bumper.changed()
+    assert other.changed()
+
+    other.bump()
+    assert bumper.changed()
+    assert not other.changed()
+
+
+def test_changed_stats_the_file_at_most_once_per_interval(tmp_path):
+    path = str(tmp_path / "generation")
+    clock = Clock()
+    watcher = FileGeneration(path, interval=1, timer=clock)
+
+    FileGeneration(path).bump()
+    assert not watcher.changed()
+    clock.now = 1
+    assert watcher.changed()
+    assert not watcher.changed()
@@ -0,0 +1,66 @@
+import threading
+
+import pytest
+
+import events
+
+redis = pytest.importorskip("redis")
+
+
+PREFIX = "surer:events:"
+
+
+def message(channel, event):
+    return {"type": "pmessage", "channel": (PREFIX + channel).encode("utf-8"), "data": events.dumps(event)}
+
+
+class ScriptedPubSub:
+    """Plays one connection: an exception instead of a list fails the
+    subscribe, and an exception inside the list drops the connection.
+    The last connection stays open once its messages are delivered."""
+
+    def __init__(self, script, last):
+        self.script = script
+        self.last = last
+
+    def psubscribe(self, pattern):
+        if isinstance(self.script, Exception):
+            raise self.script
+
+    def listen(self):
+        for item in self.script:
+            if isinstance(item, Exception):
+                raise item
+            yield item
+        if self.last:
+            threading.Event().wait()
+
+    def close(self):
+        pass
+
+
+class ScriptedRedis:
+    def __init__(self, connections):
+        self.connections = connections
+        self.subscribed = threading.Event()
+
+    def pubsub(self, **options):
+        # The listener starts inside subscribe(), before the subscription exists
+        self.subscribed.wait(5)
+        return ScriptedPubSub(self.connections.pop(0), not self.connections)
+
+
+def test_listener_reconnects_and_resyncs_after_a_redis_failure():
+    delays = []
+    hub = events.RedisEventHub("redis://localhost:6379/0", prefix=PREFIX, sleep=delays.append)
+    hub._redis = ScriptedRedis([
+        [message("project:1", {"type": "task_updated"}), redis.ConnectionError("connection lost")],
+        redis.ConnectionError("connection refused"),
+        [message("project:1", {"type": "task_created"})],
+    ])
+    subscription = hub.subscribe("project:1")
+    hub._redis.subscribed.set()
+    received = [subscription.get(timeout=5) for _ in range(3)]
+
+    assert [event and event["type"] for event in received] == ["task_updated", "resync", "task_created"]
+    assert delays == [0.5, 1.0]
@@ -0,0 +1,18 @@
+import pytest
+from flask import g
+from sqlalchemy import exc, text
+
+import app as surer
+from instrumentation import SqlStats
+
+
+def test_a_failing_statement_is_timed_and_does_not_leak_into_the_next(app):
+    with app.test_request_context(), surer.db.engine.connect() as conn:
+        g.sql_stats = stats = SqlStats()
+        with pytest.raises(exc.OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+        conn.execute(text("SELECT 1"))
+
+        assert [statement for statement, _ in stats.statements] == ["SELECT * FROM missing_table", "SELECT 1"]
+        assert all(0 <= duration < 1 for _, duration in stats.statements)
+        assert not conn.connection.info.get("query_started")
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+import app as surer
+from conftest import add_project, add_task, add_users, signed_in_client
+
+USER = "a@test"
+
+
+class StubTransport:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, payload):
+        self.sent.append(payload)
+
+
+def update_task(client, project_id, task_id, deadline):
+    return client.patch("/update_task", json={
+        "project_id": project_id,
+        "task_id": task_id,
+        "title": "Task",
+        "description": "",
+        "deadline": deadline,
+        "assignees": [{"user_email": USER, "fname": "A", "lname": "B"}],
+    })
+
+
+def deadline_emails(app, monkeypatch, stored, sent):
+    transport = StubTransport()
+    monkeypatch.setattr(surer.notification_queue, "transport", transport)
+    add_users(app, [USER])
+    project_id = add_project(app, USER)
+    task_id = add_task(app, project_id, "started", 0, assignees=[USER], deadline=stored)
+    client = signed_in_client(app, USER)
+
+    assert update_task(client, project_id, task_id, sent).status_code == 200
+    surer.notification_queue.join()
+    return transport.sent
+
+
+def test_unchanged_deadline_sends_no_email(app, monkeypatch):
+    # Stored 8 hours ahead of the client's UTC value, so on the next day from 16:00 UTC
+    assert deadline_emails(app, monkeypatch, datetime(2030, 1, 2, 1, 30), "2030-01-01T17:30:00.000Z") == []
+
+
+def test_changed_deadline_emails_the_assignees(app, monkeypatch):
+    sent = deadline_emails(app, monkeypatch, datetime(2030, 1, 2, 1, 30), "2030-01-05T17:30:00.000Z")
+
+    assert [message["To"][0]["Email"] for payload in sent for message in payload["Messages"]] == [USER]
@@ -1,7 +1,41 @@
-from typing import Any
+from typing import Any, Dict
 from decimal import Decimal
+from datetime import date, datetime, time
+import base64
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 def default(obj: Any) -> Any:
-    if isinstance(obj, Decimal):
+    if isinstance(obj, (Decimal, datetime, date, time)):
         return str(obj)
-    raise TypeError("Object of type '%s' is not JSON serializable" % type(obj).__name__)
\ No newline at end of file
+    raise TypeError("Object of type '%s' is not JSON serializable" % type(obj).__name__)
+
+# Encodes a response payload once. Datetimes and Decimals come out as str()
+# would render them, and non-string dict keys are turned into strings, the
+# same as json.dumps(..., default=str). orjson is used when it is installed.
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj, default=default, option=_ORJSON_OPTIONS)
+else:
+    def dumps(obj: Any) -> bytes:
+        return json.dumps(obj, default=default).encode("utf-8")
+
+# Pagination cursors are the keyset values of the last row served, as
+# URL-safe base64 JSON. Clients pass them back unchanged.
+def encode_cursor(values: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(dumps(values)).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values